@@ -131,6 +131,12 @@ async def run_benchmark(dataset_path: str, storage_dir: str) -> BenchmarkResult:
     toc_json = json.dumps(toc_result, indent=2)
     result.record("get_toc", (t1 - t0) * 1000, _count_tokens_approx(toc_json))
 
+    # 3b. get_toc without summaries (slim entries only)
+    t0 = time.perf_counter()
+    toc_slim = get_toc(repo=repo, storage_path=storage_dir, include_summaries=False)
+    t1 = time.perf_counter()
+    result.record("get_toc_no_summaries", (t1 - t0) * 1000, _count_tokens_approx(json.dumps(toc_slim)))
+
     # 4. get_toc with path_prefix filter
     t0 = time.perf_counter()
     toc_filtered = get_toc(repo=repo, storage_path=storage_dir, path_prefix="docs/")
@@ -0,0 +1,58 @@
+"""Content hashing for change detection."""
+
+import functools
+import hashlib
+import logging
+import os
+
+try:
+    import blake3
+except ImportError:  # Optional: faster content hashing
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:  # Optional: faster content hashing
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+# Environment variable selecting the file hash algorithm
+HASH_ALGORITHM_ENV = "JDOCMUNCH_HASH"
+DEFAULT_HASH_ALGORITHM = "sha256"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _blake3(data: bytes) -> str:
+    return "blake3:" + blake3.blake3(data).hexdigest()
+
+
+def _xxh3(data: bytes) -> str:
+    return "xxh3:" + xxhash.xxh3_128_hexdigest(data)
+
+
+@functools.lru_cache(maxsize=None)
+def _hash_function(algorithm: str):
+    """Resolve an algorithm name to a hash function, falling back to SHA256."""
+    if algorithm == "blake3" and blake3 is not None:
+        return _blake3
+    if algorithm == "xxh3" and xxhash is not None:
+        return _xxh3
+    if algorithm != DEFAULT_HASH_ALGORITHM:
+        logger.warning("Hash algorithm %r unavailable, using %s", algorithm, DEFAULT_HASH_ALGORITHM)
+    return _sha256
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Hash file content for change detection.
+
+    SHA256 by default. Set JDOCMUNCH_HASH to "blake3" or "xxh3" to use a
+    faster hash when that package is installed; those hashes carry an
+    algorithm prefix so they never compare equal to another algorithm's.
+    """
+    algorithm = os.environ.get(HASH_ALGORITHM_ENV, DEFAULT_HASH_ALGORITHM).lower()
+    return _hash_function(algorithm)(data)
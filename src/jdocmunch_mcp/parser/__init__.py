@@ -1,6 +1,29 @@
 """Markdown parsing utilities."""
 
-from .markdown import parse_markdown_to_sections
+import os
+from typing import Callable
+
+from .markdown import Section, parse_markdown_to_sections, preprocess_mdx
+from .rst import parse_rst_to_sections
 from .hierarchy import build_section_tree
 
-__all__ = ["parse_markdown_to_sections", "build_section_tree"]
+
+def _parse_mdx_to_sections(content: str, filename: str) -> list[Section]:
+    """Parse MDX by stripping JSX/front-matter and parsing the result as markdown."""
+    return parse_markdown_to_sections(preprocess_mdx(content), filename)
+
+
+# Section parsers by lowercase file extension; anything else is parsed as markdown
+_EXT_PARSERS: dict[str, Callable[[str, str], list[Section]]] = {
+    '.rst': parse_rst_to_sections,
+    '.mdx': _parse_mdx_to_sections,
+}
+
+
+def parse_doc_to_sections(content: str, filename: str) -> list[Section]:
+    """Parse a documentation file into sections with the parser for its extension."""
+    ext = os.path.splitext(filename)[1].lower()
+    return _EXT_PARSERS.get(ext, parse_markdown_to_sections)(content, filename)
+
+
+__all__ = ["parse_markdown_to_sections", "parse_doc_to_sections", "build_section_tree"]
@@ -4,7 +4,7 @@ import hashlib
 import re
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 
 @dataclass
@@ -32,26 +32,29 @@ def slugify(text: str) -> str:
     return text
 
 
+# Keyword heuristics, compiled once at import
+_CODE_RE = re.compile(r'`([^`]+)`')
+# Words that look like identifiers (camelCase, snake_case, etc.)
+_IDENTIFIER_RE = re.compile(r'\b([a-z]+[A-Z][a-zA-Z]*|[a-z]+_[a-z_]+)\b')
+# Common technical terms, as one alternation so the content is scanned once
+_TECH_TERM_RE = re.compile(
+    r'\b(install|setup|config|api|auth|oauth|token|key|secret'
+    r'|import|export|module|package|dependency'
+    r'|error|debug|log|test|build|deploy)\b',
+    re.IGNORECASE,
+)
+
+
 def extract_keywords(content: str) -> list[str]:
     """Extract keywords from content using simple heuristics."""
     # Find code blocks and inline code
-    code_pattern = r'`([^`]+)`'
-    code_matches = re.findall(code_pattern, content)
+    code_matches = _CODE_RE.findall(content)
 
     # Find words that look like identifiers (camelCase, snake_case, etc.)
-    identifier_pattern = r'\b([a-z]+[A-Z][a-zA-Z]*|[a-z]+_[a-z_]+)\b'
-    identifiers = re.findall(identifier_pattern, content)
+    identifiers = _IDENTIFIER_RE.findall(content)
 
     # Common technical terms
-    tech_terms = []
-    term_patterns = [
-        r'\b(install|setup|config|api|auth|oauth|token|key|secret)\b',
-        r'\b(import|export|module|package|dependency)\b',
-        r'\b(error|debug|log|test|build|deploy)\b',
-    ]
-    for pattern in term_patterns:
-        matches = re.findall(pattern, content, re.IGNORECASE)
-        tech_terms.extend([m.lower() for m in matches])
+    tech_terms = _TECH_TERM_RE.findall(content)
 
     # Combine and dedupe
     all_keywords = set()
@@ -60,7 +63,7 @@ def extract_keywords(content: str) -> list[str]:
         if len(kw_clean) > 2 and len(kw_clean) < 30:
             all_keywords.add(kw_clean)
 
-    return sorted(list(all_keywords))[:20]  # Limit to 20 keywords
+    return sorted(all_keywords)[:20]  # Limit to 20 keywords
 
 
 def _content_hash_suffix(content: str) -> str:
@@ -125,6 +128,33 @@ def preprocess_mdx(content: str) -> str:
     return content
 
 
+def _byte_offset_counter(content: str) -> Callable[[int], int]:
+    """
+    Build a function mapping character offsets in content to UTF-8 byte offsets.
+
+    Offsets must be requested in increasing order; only the text between
+    consecutive calls is encoded. ASCII content maps offsets unchanged.
+    """
+    if content.isascii():
+        return lambda offset: offset
+
+    byte_offset = 0
+    prev_offset = 0
+
+    def byte_offset_of(offset: int) -> int:
+        nonlocal byte_offset, prev_offset
+        byte_offset += len(content[prev_offset:offset].encode('utf-8'))
+        prev_offset = offset
+        return byte_offset
+
+    return byte_offset_of
+
+
+# ATX headers (H1-H6), found with a single scan over the whole document.
+# [^\S\n] is \s without the newline, so a match never spans lines.
+_HEADER_RE = re.compile(r'^(#{1,6})[^\S\n]+(.+)$', re.MULTILINE)
+
+
 def parse_markdown_to_sections(content: str, filename: str) -> list[Section]:
     """
     Parse markdown content into sections based on headers.
@@ -137,109 +167,79 @@ def parse_markdown_to_sections(content: str, filename: str) -> list[Section]:
     - Strips YAML front-matter and uses title: field if present
     - Splits long files (>200 lines) on double-blank-line boundaries
     """
-    # Strip front-matter and extract metadata
-    stripped_content, metadata = _strip_front_matter(content)
-
-    lines = content.split('\n')
-    sections: list[Section] = []
-
     # P3-1: Use Path.stem for extension stripping (handles .md, .markdown, .mdx, .rst)
     file_prefix = slugify(Path(filename).stem + '-' + '-'.join(Path(filename).parts[:-1]) if '/' in filename else Path(filename).stem)
 
-    # Check if file has any headers
-    header_pattern = re.compile(r'^(#{1,6})\s+(.+)$')
-    has_headers = any(header_pattern.match(line) for line in lines)
-
-    if not has_headers:
+    headers = list(_HEADER_RE.finditer(content))
+    if not headers:
+        # Strip front-matter and extract metadata
+        _, metadata = _strip_front_matter(content)
         return _parse_headingless(content, filename, file_prefix, metadata)
 
-    # Track current position
-    current_byte_offset = 0
-    current_section_start = 0
-    current_section_lines: list[str] = []
-    current_header: Optional[tuple[int, str, int]] = None  # (depth, title, line_num)
-    parent_stack: list[str] = []  # Stack of parent section IDs
-
-    def finalize_section():
-        """Create a Section from the current accumulated content."""
-        nonlocal current_section_lines, current_header, current_section_start
-
-        if current_header is None:
-            # Content before any header - create root section
-            if current_section_lines and any(line.strip() for line in current_section_lines):
-                section_content = '\n'.join(current_section_lines)
-                section_id = f"{file_prefix}-root"
-                sections.append(Section(
-                    id=section_id,
-                    file=filename,
-                    path=filename,
-                    title=filename,
-                    depth=0,
-                    parent=None,
-                    content=section_content,
-                    keywords=extract_keywords(section_content),
-                    line_count=len(current_section_lines),
-                    byte_offset=current_section_start,
-                    byte_length=len(section_content.encode('utf-8')),
-                ))
-                parent_stack.append(section_id)
-        else:
-            depth, title, _ = current_header
-            section_content = '\n'.join(current_section_lines)
-            slug = slugify(title)
-            # P3-1: Use content hash for dedup instead of counter
-            section_id = f"{file_prefix}-{slug}"
-
-            # Ensure unique IDs using content hash
-            if any(s.id == section_id for s in sections):
-                section_id = f"{file_prefix}-{slug}-{_content_hash_suffix(section_content)}"
-
-            # Find parent: last section with smaller depth
-            parent = None
-            while parent_stack:
-                parent_section = next((s for s in sections if s.id == parent_stack[-1]), None)
-                if parent_section and parent_section.depth < depth:
-                    parent = parent_stack[-1]
-                    break
-                parent_stack.pop()
+    sections: list[Section] = []
+    section_ids: set[str] = set()
+    parent_stack: list[tuple[str, int]] = []  # (section ID, depth) of open ancestors
+
+    byte_offset_of = _byte_offset_counter(content)
 
+    # Content before any header - create root section
+    first_start = headers[0].start()
+    if first_start > 0:
+        root_content = content[:first_start - 1]
+        if root_content.strip():
+            section_id = f"{file_prefix}-root"
             sections.append(Section(
                 id=section_id,
                 file=filename,
-                path=f"{filename}#{slug}",
-                title=title,
-                depth=depth,
-                parent=parent,
-                content=section_content,
-                keywords=extract_keywords(section_content),
-                line_count=len(current_section_lines),
-                byte_offset=current_section_start,
-                byte_length=len(section_content.encode('utf-8')),
+                path=filename,
+                title=filename,
+                depth=0,
+                parent=None,
+                content=root_content,
+                keywords=extract_keywords(root_content),
+                line_count=root_content.count('\n') + 1,
+                byte_offset=0,
+                byte_length=len(root_content.encode('utf-8')),
             ))
-            parent_stack.append(section_id)
-
-        current_section_lines = []
-
-    for line_num, line in enumerate(lines):
-        match = header_pattern.match(line)
-
-        if match:
-            # Finalize previous section
-            finalize_section()
-
-            # Start new section
-            depth = len(match.group(1))
-            title = match.group(2).strip()
-            current_header = (depth, title, line_num)
-            current_section_start = current_byte_offset
-            current_section_lines = [line]
-        else:
-            current_section_lines.append(line)
-
-        current_byte_offset += len(line.encode('utf-8')) + 1  # +1 for newline
+            section_ids.add(section_id)
+            parent_stack.append((section_id, 0))
+
+    # Each section runs from its header line up to the line before the next header
+    for i, match in enumerate(headers):
+        start = match.start()
+        end = headers[i + 1].start() - 1 if i + 1 < len(headers) else len(content)
+        section_content = content[start:end]
+
+        depth = len(match.group(1))
+        title = match.group(2).strip()
+        slug = slugify(title)
+        # P3-1: Use content hash for dedup instead of counter
+        section_id = f"{file_prefix}-{slug}"
+
+        # Ensure unique IDs using content hash
+        if section_id in section_ids:
+            section_id = f"{file_prefix}-{slug}-{_content_hash_suffix(section_content)}"
+
+        # Find parent: last section with smaller depth
+        while parent_stack and parent_stack[-1][1] >= depth:
+            parent_stack.pop()
+        parent = parent_stack[-1][0] if parent_stack else None
 
-    # Finalize last section
-    finalize_section()
+        sections.append(Section(
+            id=section_id,
+            file=filename,
+            path=f"{filename}#{slug}",
+            title=title,
+            depth=depth,
+            parent=parent,
+            content=section_content,
+            keywords=extract_keywords(section_content),
+            line_count=section_content.count('\n') + 1,
+            byte_offset=byte_offset_of(start),
+            byte_length=len(section_content.encode('utf-8')),
+        ))
+        section_ids.add(section_id)
+        parent_stack.append((section_id, depth))
 
     return sections
 
@@ -288,27 +288,28 @@ def _parse_headingless(
             byte_length=len(content.encode('utf-8')),
         )]
 
-    # Split long files on double-blank-line boundaries
+    # Split long files on double-blank-line boundaries. Chunks are sliced
+    # out of content by character offset rather than re-joined from lines.
+    byte_offset_of = _byte_offset_counter(content)
     sections: list[Section] = []
-    chunk_lines: list[str] = []
-    chunk_start_offset = 0
-    current_offset = 0
+    chunk_start = 0  # character offset of the chunk's first line
+    chunk_first_line = 0
+    line_start = 0
     blank_count = 0
     chunk_index = 0
 
-    for line in lines:
-        line_bytes = len(line.encode('utf-8')) + 1
+    for line_num, line in enumerate(lines):
+        line_end = line_start + len(line)
 
         if not line.strip():
             blank_count += 1
         else:
             blank_count = 0
 
-        chunk_lines.append(line)
-
-        if blank_count >= 2 and len(chunk_lines) >= 20:
+        if blank_count >= 2 and line_num + 1 - chunk_first_line >= 20:
             # Flush chunk
-            chunk_content = '\n'.join(chunk_lines)
+            chunk_lines = lines[chunk_first_line:line_num + 1]
+            chunk_content = content[chunk_start:line_end]
             # Determine chunk title
             chunk_title = title if chunk_index == 0 else f"{title} (continued {chunk_index + 1})"
             for cl in chunk_lines:
@@ -328,20 +329,21 @@ def _parse_headingless(
                 content=chunk_content,
                 keywords=extract_keywords(chunk_content),
                 line_count=len(chunk_lines),
-                byte_offset=chunk_start_offset,
+                byte_offset=byte_offset_of(chunk_start),
                 byte_length=len(chunk_content.encode('utf-8')),
             ))
 
-            chunk_lines = []
-            chunk_start_offset = current_offset + line_bytes
+            chunk_start = line_end + 1
+            chunk_first_line = line_num + 1
             chunk_index += 1
             blank_count = 0
 
-        current_offset += line_bytes
+        line_start = line_end + 1
 
     # Flush remaining
+    chunk_lines = lines[chunk_first_line:]
     if chunk_lines and any(l.strip() for l in chunk_lines):
-        chunk_content = '\n'.join(chunk_lines)
+        chunk_content = content[chunk_start:]
         chunk_title = title if chunk_index == 0 else f"{title} (continued {chunk_index + 1})"
         section_id = f"{file_prefix}-part-{chunk_index}"
         sections.append(Section(
@@ -354,7 +356,7 @@ def _parse_headingless(
             content=chunk_content,
             keywords=extract_keywords(chunk_content),
             line_count=len(chunk_lines),
-            byte_offset=chunk_start_offset,
+            byte_offset=byte_offset_of(chunk_start),
             byte_length=len(chunk_content.encode('utf-8')),
         ))
 
@@ -2,6 +2,7 @@
 
 import fnmatch
 import logging
+import os
 import re
 from pathlib import Path
 
@@ -37,8 +38,16 @@ SENSITIVE_PATTERNS = [
     '*.cert',
 ]
 
-# Regex patterns to detect secrets in file content
-SECRET_CONTENT_PATTERNS = [
+# Lookup forms of the lists above, built once at import. SKIP_FILES matches
+# case-insensitively; the globs follow fnmatch's platform case rules.
+_SKIP_FILES_LOWER = frozenset(s.lower() for s in SKIP_FILES)
+_SENSITIVE_RE = re.compile(
+    '|'.join(fnmatch.translate(p) for p in SENSITIVE_PATTERNS),
+    re.IGNORECASE if os.path.normcase('A') == 'a' else 0,
+)
+
+# Regex patterns to detect secrets in file content, compiled once at import
+SECRET_CONTENT_PATTERNS = (
     (re.compile(r'-----BEGIN.*PRIVATE KEY-----'), 'private key'),
     (re.compile(r'AKIA[0-9A-Z]{16}'), 'AWS access key'),
     (re.compile(r'sk-ant-[a-zA-Z0-9_-]+'), 'Anthropic API key'),
@@ -46,18 +55,15 @@ SECRET_CONTENT_PATTERNS = [
     (re.compile(r'glpat-[a-zA-Z0-9\-_]{20,}'), 'GitLab personal access token'),
     (re.compile(r'sk-[a-zA-Z0-9]{20,}T3BlbkFJ[a-zA-Z0-9]+'), 'OpenAI API key'),
     (re.compile(r'xox[boaprs]-[a-zA-Z0-9\-]+'), 'Slack token'),
-]
+)
 
 
 def is_sensitive_filename(filename: str) -> bool:
     """Check if a filename matches known sensitive file patterns."""
     basename = Path(filename).name
-    if basename.lower() in {s.lower() for s in SKIP_FILES}:
+    if basename.lower() in _SKIP_FILES_LOWER:
         return True
-    for pattern in SENSITIVE_PATTERNS:
-        if fnmatch.fnmatch(basename, pattern):
-            return True
-    return False
+    return _SENSITIVE_RE.match(basename) is not None
 
 
 def scan_content_for_secrets(content: str, filename: str) -> list[str]:
@@ -55,6 +55,11 @@ Supports:
                         "description": "Use AI to generate section summaries (requires ANTHROPIC_API_KEY)",
                         "default": True,
                     },
+                    "incremental": {
+                        "type": "boolean",
+                        "description": "Reuse sections of files unchanged since the last index (set false to rebuild everything, e.g. to regenerate summaries)",
+                        "default": True,
+                    },
                 },
                 "required": ["url"],
             },
@@ -307,6 +312,7 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             result = await do_index_repo(
                 url=arguments["url"],
                 use_ai_summaries=arguments.get("use_ai_summaries", True),
+                incremental=arguments.get("incremental", True),
             )
         elif name == "index_local":
             result = await do_index_local(
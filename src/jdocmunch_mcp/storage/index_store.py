@@ -1,18 +1,38 @@
 """Index storage and retrieval."""
 
+import bisect
+import fnmatch
+import heapq
 import json
 import os
-from dataclasses import dataclass, asdict, field
+import re
+import shutil
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Union
 
 from ..parser.markdown import Section
 
+try:
+    import orjson
+except ImportError:  # Optional: faster index (de)serialization
+    orjson = None
+
 # Increment this when the index schema changes in a backward-incompatible way.
 # Old caches with a lower version will be discarded and re-indexed.
 CURRENT_INDEX_VERSION = 1
 
+# Word tokens used for the in-memory search postings
+_TOKEN_RE = re.compile(r"\w+")
+
+# Loaded indexes kept in memory, keyed by index file path and validated
+# against the file's (mtime_ns, size, inode) so a re-index invalidates the
+# entry; index files are replaced by rename, so every write gets a new inode.
+INDEX_CACHE_SIZE = 32
+_index_cache: "OrderedDict[str, tuple[tuple[int, int, int], RepoIndex]]" = OrderedDict()
+
 
 @dataclass
 class RepoIndex:
@@ -21,6 +41,8 @@ class RepoIndex:
     owner: str
     name: str
     indexed_at: str
+    # Every discovered documentation file, including files skipped for
+    # secrets or that produced no sections; file_hashes covers indexed files
     doc_files: list[str]
     sections: list[dict]
     # P1-4: New fields for cache correctness
@@ -30,22 +52,196 @@ class RepoIndex:
 
     def get_section(self, section_id: str) -> Optional[dict]:
         """Get a section by ID."""
-        for section in self.sections:
-            if section["id"] == section_id:
-                return section
-        return None
+        positions = self.__dict__.get("_id_positions")
+        if positions is None:
+            positions = {}
+            for position, section in enumerate(self.sections):
+                # First occurrence wins, as with a linear scan
+                positions.setdefault(section["id"], position)
+            self._id_positions = positions
+        position = positions.get(section_id)
+        return None if position is None else self.sections[position]
+
+    def file_sections(self, file_path: str) -> list[dict]:
+        """Sections belonging to one file, in index order."""
+        by_file, _ = self._buckets()
+        return [self.sections[p] for p in by_file.get(file_path, ())]
+
+    def _postings(self) -> dict[str, list[int]]:
+        """
+        Map each lowercase word token to the positions of sections containing it.
+
+        Built from titles, summaries, and keywords on first use and kept for
+        the lifetime of this index object.
+        """
+        postings = self.__dict__.get("_token_postings")
+        if postings is None:
+            postings = {}
+            for position, section in enumerate(self.sections):
+                text = " ".join([
+                    section["title"],
+                    section.get("summary", ""),
+                    *section.get("keywords", []),
+                ]).lower()
+                for token in set(_TOKEN_RE.findall(text)):
+                    postings.setdefault(token, []).append(position)
+            self._token_postings = postings
+        return postings
+
+    def _vocabulary(self) -> tuple[str, list[int], list[list[int]]]:
+        """
+        The postings tokens joined into one NUL-separated string.
+
+        Returns the joined string, the start offset of each token in it, and
+        each token's section positions, so a substring lookup over the whole
+        vocabulary is a run of str.find calls instead of a loop over tokens.
+        """
+        vocabulary = self.__dict__.get("_token_vocabulary")
+        if vocabulary is None:
+            postings = self._postings()
+            starts = []
+            offset = 0
+            for token in postings:
+                starts.append(offset)
+                offset += len(token) + 1
+            vocabulary = ("\x00".join(postings), starts, list(postings.values()))
+            self._token_vocabulary = vocabulary
+        return vocabulary
+
+    def _search_fields(self) -> list[tuple[str, str, frozenset[str]]]:
+        """
+        Lowercased title, lowercased summary, and keyword set for each section.
+
+        Prepared once per index object so scoring does not re-lowercase every
+        section's fields on every query.
+        """
+        fields = self.__dict__.get("_lowered_fields")
+        if fields is None:
+            fields = [
+                (
+                    section["title"].lower(),
+                    section.get("summary", "").lower(),
+                    frozenset(section.get("keywords", [])),
+                )
+                for section in self.sections
+            ]
+            self._lowered_fields = fields
+        return fields
+
+    def _buckets(self) -> tuple[dict[str, list[int]], dict[int, list[int]]]:
+        """Group section positions by file and by depth (built on first use)."""
+        buckets = self.__dict__.get("_filter_buckets")
+        if buckets is None:
+            by_file: dict[str, list[int]] = {}
+            by_depth: dict[int, list[int]] = {}
+            for position, section in enumerate(self.sections):
+                by_file.setdefault(section["file"], []).append(position)
+                by_depth.setdefault(section["depth"], []).append(position)
+            buckets = (by_file, by_depth)
+            self._filter_buckets = buckets
+        return buckets
+
+    def _filter_positions(
+        self,
+        path_prefix: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        file_pattern: Optional[str] = None,
+    ) -> Optional[set[int]]:
+        """
+        Positions of sections passing the path, depth, and glob filters.
 
-    def search(self, query: str) -> list[dict]:
-        """Search sections by query (keywords and title)."""
+        Filters are evaluated once per distinct file or depth rather than
+        per section. Returns None when no filter is set.
+        """
+        if not path_prefix and max_depth is None and not file_pattern:
+            return None
+
+        by_file, by_depth = self._buckets()
+        files = list(by_file)
+        if path_prefix:
+            files = [f for f in files if f.startswith(path_prefix)]
+        if file_pattern:
+            pattern_cache = self.__dict__.setdefault("_pattern_files", {})
+            if file_pattern not in pattern_cache:
+                pattern_cache[file_pattern] = {
+                    f for f in by_file if fnmatch.fnmatch(f, file_pattern)
+                }
+            files = [f for f in files if f in pattern_cache[file_pattern]]
+
+        positions = {p for f in files for p in by_file[f]}
+        if max_depth is not None:
+            positions.intersection_update(
+                p
+                for depth, depth_positions in by_depth.items() if depth <= max_depth
+                for p in depth_positions
+            )
+        return positions
+
+    def filter_sections(
+        self,
+        path_prefix: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        file_pattern: Optional[str] = None,
+    ) -> list[dict]:
+        """Sections passing the path, depth, and glob filters, in index order."""
+        allowed = self._filter_positions(path_prefix, max_depth, file_pattern)
+        if allowed is None:
+            return self.sections
+        return [s for position, s in enumerate(self.sections) if position in allowed]
+
+    def _candidate_positions(self, query_words: set[str]) -> Optional[set[int]]:
+        """
+        Narrow the sections that can score for a query using the postings.
+
+        A query word that occurs inside a field has each of its word runs
+        inside a single token of that field, so sections whose tokens contain
+        none of a word's runs cannot match it. Returns None (scan everything)
+        when a word has no word characters to look up.
+        """
+        if not query_words:
+            return None
+
+        blob, starts, token_positions = self._vocabulary()
+        positions: set[int] = set()
+        for word in query_words:
+            runs = _TOKEN_RE.findall(word)
+            if not runs:
+                return None
+            run = max(runs, key=len)
+            # Runs hold no NUL, so each hit lies inside one token; after a
+            # hit, resume at the next token so each token is counted once.
+            hit = blob.find(run)
+            while hit != -1:
+                i = bisect.bisect_right(starts, hit) - 1
+                positions.update(token_positions[i])
+                if i + 1 == len(starts):
+                    break
+                hit = blob.find(run, starts[i + 1])
+        return positions
+
+    def search_iter(
+        self,
+        query: str,
+        path_prefix: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        file_pattern: Optional[str] = None,
+    ) -> Iterator[tuple[int, dict]]:
+        """Lazily yield (score, section) for each matching section, in index order."""
         query_lower = query.lower()
         query_words = set(query_lower.split())
 
-        results: list[tuple[int, dict]] = []
-        for section in self.sections:
+        positions = self._candidate_positions(query_words)
+        allowed = self._filter_positions(path_prefix, max_depth, file_pattern)
+        if allowed is not None:
+            positions = allowed if positions is None else positions & allowed
+        candidates = range(len(self.sections)) if positions is None else sorted(positions)
+        fields = self._search_fields()
+
+        for position in candidates:
+            title_lower, summary_lower, keywords = fields[position]
             score = 0
 
             # Title match
-            title_lower = section["title"].lower()
             if query_lower in title_lower:
                 score += 10
             for word in query_words:
@@ -53,12 +249,10 @@ class RepoIndex:
                     score += 3
 
             # Keyword match
-            keywords = set(section.get("keywords", []))
             matching_keywords = query_words & keywords
             score += len(matching_keywords) * 2
 
             # Summary match
-            summary_lower = section.get("summary", "").lower()
             if query_lower in summary_lower:
                 score += 5
             for word in query_words:
@@ -66,11 +260,122 @@ class RepoIndex:
                     score += 1
 
             if score > 0:
-                results.append((score, section))
+                yield score, self.sections[position]
 
-        # Sort by score descending
-        results.sort(key=lambda x: -x[0])
-        return [section for _, section in results]
+    def search(
+        self,
+        query: str,
+        path_prefix: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        file_pattern: Optional[str] = None,
+        max_results: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        Search sections by query (keywords and title), optionally filtered by path, depth, or glob.
+
+        Results are ordered by score descending, ties in index order. With
+        max_results, only the top results are kept while scanning.
+        """
+        scored = self.search_iter(query, path_prefix, max_depth, file_pattern)
+        if max_results is None:
+            ranked = sorted(scored, key=lambda x: x[0], reverse=True)
+        else:
+            ranked = heapq.nlargest(max_results, scored, key=lambda x: x[0])
+        return [section for _, section in ranked]
+
+
+def _dumps(data) -> bytes:
+    """Serialize one JSON value on a single line, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes):
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _write_index_file(path: Path, index: "RepoIndex") -> None:
+    """
+    Write an index as newline-delimited JSON.
+
+    The first line is a header with every index field except the sections,
+    plus section_count; each following line holds one section. Readers that
+    only need metadata (list_repos) stop after the header.
+    """
+    header = {f.name: getattr(index, f.name) for f in fields(index) if f.name != "sections"}
+    header["section_count"] = len(index.sections)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(_dumps(header))
+        f.write(b"\n")
+        for section in index.sections:
+            f.write(_dumps(section))
+            f.write(b"\n")
+    os.replace(tmp_path, path)
+
+
+def _parse_index_header(line: bytes) -> Optional[dict]:
+    """Parse an index file's first line; None if the file is a single JSON document."""
+    try:
+        header = _loads(line)
+    except ValueError:
+        # Indented single-document index: the first line is just "{"
+        return None
+    if not isinstance(header, dict) or "section_count" not in header:
+        return None
+    return header
+
+
+def _read_index_file(path: Path) -> dict:
+    """
+    Read an index file into a dict of RepoIndex fields.
+
+    Accepts both the newline-delimited format written by _write_index_file
+    and the single JSON document written by earlier versions.
+    """
+    data = path.read_bytes()
+    first, _, rest = data.partition(b"\n")
+    header = _parse_index_header(first)
+    if header is None:
+        return _loads(data)
+    header.pop("section_count")
+    header["sections"] = [_loads(line) for line in rest.splitlines() if line]
+    return header
+
+
+def normalize_line_endings(content: str) -> str:
+    """Convert \\r\\n and lone \\r line endings to \\n, like text-mode universal newlines."""
+    if '\r' not in content:
+        return content
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _tmp_path(path: Path) -> Path:
+    """Sibling path a file is written to before being renamed over path."""
+    return path.with_name(path.name + ".tmp")
+
+
+def _write_raw_file(path: Path, content: Union[str, bytes]) -> None:
+    """
+    Write raw file content, normalizing line endings to \\n for consistent byte offsets.
+
+    UTF-8 bytes are written as given, skipping the str encode. The file is
+    replaced by rename, never rewritten in place, so readers see the old or
+    new content and other links to the old file are left untouched.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, bytes):
+        if b'\r' in content:
+            content = content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    else:
+        content = normalize_line_endings(content).encode("utf-8")
+    tmp_path = _tmp_path(path)
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
 
 
 class IndexStore:
@@ -96,13 +401,43 @@ class IndexStore:
         """Get path to content directory."""
         return self.base_path / self._repo_key(owner, name)
 
+    def _staging_dir(self, owner: str, name: str) -> Path:
+        """Get path to the directory raw files are staged in until save_index."""
+        return self.base_path / f".staging-{self._repo_key(owner, name)}"
+
+    def stage_raw_file(self, owner: str, name: str, file_path: str, content: str) -> None:
+        """
+        Write one raw file to the staging area ahead of save_index.
+
+        Lets indexers drop each file's text once it is parsed instead of
+        holding every file in memory until the index is saved. Staged files
+        replace the cached copies only when save_index runs.
+        """
+        _write_raw_file(self._staging_dir(owner, name) / file_path, content)
+
+    def discard_staged(self, owner: str, name: str) -> None:
+        """Remove any raw files staged for a repo that were not saved."""
+        shutil.rmtree(self._staging_dir(owner, name), ignore_errors=True)
+
+    def _commit_staged(self, owner: str, name: str, content_dir: Path) -> None:
+        """Move staged raw files into the content directory."""
+        staging_dir = self._staging_dir(owner, name)
+        if not staging_dir.is_dir():
+            return
+        for staged in staging_dir.rglob("*"):
+            if staged.is_file():
+                target = content_dir / staged.relative_to(staging_dir)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staged, target)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
     def save_index(
         self,
         owner: str,
         name: str,
         doc_files: list[str],
         sections: list[Section],
-        raw_files: dict[str, str],
+        raw_files: Optional[dict[str, Union[str, bytes]]] = None,
         commit_hash: str = "",
         file_hashes: Optional[dict[str, str]] = None,
     ) -> RepoIndex:
@@ -114,7 +449,9 @@ class IndexStore:
             name: Repository name
             doc_files: List of documentation file paths
             sections: Parsed sections with summaries
-            raw_files: Dict mapping file paths to raw content
+            raw_files: Dict mapping file paths to raw content (str, or
+                UTF-8 bytes), in addition to any files written with
+                stage_raw_file
             commit_hash: Git commit SHA at time of indexing
             file_hashes: Dict mapping file paths to content hashes
 
@@ -126,11 +463,9 @@ class IndexStore:
         content_dir.mkdir(parents=True, exist_ok=True)
 
         # Save raw files — normalize line endings to \n for consistent byte offsets
-        for file_path, content in raw_files.items():
-            normalized = content.replace('\r\n', '\n')
-            file_full_path = content_dir / file_path
-            file_full_path.parent.mkdir(parents=True, exist_ok=True)
-            file_full_path.write_text(normalized, encoding="utf-8", newline='')
+        self._commit_staged(owner, name, content_dir)
+        for file_path, content in (raw_files or {}).items():
+            _write_raw_file(content_dir / file_path, content)
 
         # Build index
         index = RepoIndex(
@@ -162,19 +497,46 @@ class IndexStore:
 
         # Save index JSON
         index_path = self._index_path(owner, name)
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(asdict(index), f, indent=2)
+        _write_index_file(index_path, index)
+        _index_cache.pop(str(index_path), None)
 
         return index
 
     def load_index(self, owner: str, name: str) -> Optional[RepoIndex]:
-        """Load a repo index if it exists. Returns None for outdated indexes."""
+        """
+        Load a repo index if it exists. Returns None for outdated indexes.
+
+        Loaded indexes are cached in memory until the index file changes on
+        disk, so the returned object is shared and must not be mutated.
+        """
         index_path = self._index_path(owner, name)
-        if not index_path.exists():
+        try:
+            stat = index_path.stat()
+        except FileNotFoundError:
+            _index_cache.pop(str(index_path), None)
             return None
 
-        with open(index_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        cache_key = str(index_path)
+        file_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        cached = _index_cache.get(cache_key)
+        if cached is not None and cached[0] == file_key:
+            _index_cache.move_to_end(cache_key)
+            return cached[1]
+
+        index = self._read_index(index_path)
+        if index is None:
+            _index_cache.pop(cache_key, None)
+            return None
+
+        _index_cache[cache_key] = (file_key, index)
+        _index_cache.move_to_end(cache_key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+        return index
+
+    def _read_index(self, index_path: Path) -> Optional[RepoIndex]:
+        """Read and validate an index file from disk."""
+        data = _read_index_file(index_path)
 
         # P1-5: Backward-compatible cache loading
         stored_version = data.get("index_version", 0)
@@ -242,11 +604,12 @@ class IndexStore:
         self,
         owner: str,
         name: str,
-        changed_files: dict[str, str],
+        changed_files: dict[str, Union[str, bytes]],
         deleted_files: list[str],
         new_sections_by_file: dict[str, list[Section]],
         new_file_hashes: dict[str, str],
         commit_hash: str = "",
+        doc_files: Optional[list[str]] = None,
     ) -> Optional[RepoIndex]:
         """
         Incrementally update an existing index.
@@ -254,11 +617,16 @@ class IndexStore:
         Args:
             owner: Repository owner
             name: Repository name
-            changed_files: Dict of changed file paths to new raw content
+            changed_files: Dict of changed file paths to new raw content (str or UTF-8 bytes)
+                (files written with stage_raw_file are also applied)
             deleted_files: List of deleted file paths
-            new_sections_by_file: Dict of file path to new parsed sections
+            new_sections_by_file: Dict of file path to new parsed sections;
+                these replace any existing sections for the file
             new_file_hashes: Updated file hashes for changed/new files
             commit_hash: New commit hash
+            doc_files: Full list of discovered documentation files; when
+                omitted, the existing list is adjusted for changed and
+                deleted files
 
         Returns:
             Updated RepoIndex or None if no existing index
@@ -270,7 +638,7 @@ class IndexStore:
         content_dir = self._content_dir(owner, name)
 
         # Remove sections and files for deleted files
-        affected_files = set(deleted_files) | set(changed_files.keys())
+        affected_files = set(deleted_files) | set(changed_files) | set(new_sections_by_file)
         remaining_sections = [
             s for s in index.sections if s["file"] not in affected_files
         ]
@@ -283,15 +651,13 @@ class IndexStore:
             cached = content_dir / file_path
             if cached.exists():
                 cached.unlink()
-            index.file_hashes.pop(file_path, None)
 
         # Write changed file content and add new sections
+        self._commit_staged(owner, name, content_dir)
         for file_path, content in changed_files.items():
-            normalized = content.replace('\r\n', '\n')
-            file_full_path = content_dir / file_path
-            file_full_path.parent.mkdir(parents=True, exist_ok=True)
-            file_full_path.write_text(normalized, encoding="utf-8", newline='')
+            _write_raw_file(content_dir / file_path, content)
 
+        for file_path in [*changed_files, *new_sections_by_file]:
             if file_path not in remaining_doc_files:
                 remaining_doc_files.append(file_path)
 
@@ -319,6 +685,8 @@ class IndexStore:
             updated_hashes.pop(f, None)
 
         remaining_doc_files.sort()
+        if doc_files is not None:
+            remaining_doc_files = list(doc_files)
 
         # Build updated index
         updated_index = RepoIndex(
@@ -335,8 +703,8 @@ class IndexStore:
 
         # Save
         index_path = self._index_path(owner, name)
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(asdict(updated_index), f, indent=2)
+        _write_index_file(index_path, updated_index)
+        _index_cache.pop(str(index_path), None)
 
         return updated_index
 
@@ -345,27 +713,32 @@ class IndexStore:
         repos = []
         for index_file in self.base_path.glob("*.json"):
             try:
-                with open(index_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                # Only the header line is needed unless the file is a legacy
+                # single-document index
+                with open(index_file, "rb") as f:
+                    data = _parse_index_header(f.readline())
+                if data is None:
+                    data = _read_index_file(index_file)
+                    data["section_count"] = len(data["sections"])
                 repos.append({
                     "repo": data["repo"],
                     "indexed_at": data["indexed_at"],
-                    "section_count": len(data["sections"]),
+                    "section_count": data["section_count"],
                     "file_count": len(data["doc_files"]),
                     "index_version": data.get("index_version", 0),
                     "commit_hash": data.get("commit_hash", ""),
                 })
-            except (json.JSONDecodeError, KeyError):
+            except (ValueError, KeyError):
                 continue
         return repos
 
     def delete_index(self, owner: str, name: str) -> bool:
         """Delete a repo index and its content."""
-        import shutil
-
         index_path = self._index_path(owner, name)
         content_dir = self._content_dir(owner, name)
 
+        _index_cache.pop(str(index_path), None)
+
         deleted = False
         if index_path.exists():
             index_path.unlink()
@@ -373,5 +746,6 @@ class IndexStore:
         if content_dir.exists():
             shutil.rmtree(content_dir)
             deleted = True
+        self.discard_staged(owner, name)
 
         return deleted
@@ -1,6 +1,7 @@
 """AI-powered batch summarization of sections."""
 
 import asyncio
+import json
 import logging
 import os
 from typing import Optional
@@ -12,6 +13,16 @@ logger = logging.getLogger(__name__)
 # Max concurrent Ollama/Anthropic requests
 DEFAULT_CONCURRENCY = 8
 
+# Sections packed into a single summarization request, capped by prompt size
+SECTIONS_PER_REQUEST = 20
+REQUEST_CHAR_BUDGET = 24000
+
+# Section content included in a prompt
+MAX_PROMPT_CONTENT = 2000
+
+# Output tokens allowed per summary in a packed request
+TOKENS_PER_SUMMARY = 60
+
 
 class BatchSummarizer:
     """Generate summaries for documentation sections using AI (Anthropic or Ollama)."""
@@ -69,12 +80,12 @@ class BatchSummarizer:
             logger.warning("Ollama error: %s", e)
             return ""
 
-    async def _anthropic_summarize(self, prompt: str) -> str:
+    async def _anthropic_summarize(self, prompt: str, max_tokens: int = 100) -> str:
         """Call Anthropic API for summarization (async)."""
         try:
             response = await self.client.messages.create(
                 model="claude-haiku-4-5-20251001",
-                max_tokens=100,
+                max_tokens=max_tokens,
                 messages=[{"role": "user", "content": prompt}],
             )
             return response.content[0].text.strip()
@@ -84,19 +95,16 @@ class BatchSummarizer:
 
     async def summarize_section(self, section: Section) -> str:
         """Generate a one-line summary for a section."""
-        if not section.content.strip():
-            return ""
-
-        # Skip very short sections — no AI needed
-        if section.line_count < 3:
-            return section.content.strip()[:100]
+        quick = _quick_summary(section)
+        if quick is not None:
+            return quick
 
         prompt = f"""Summarize this documentation section in ONE short sentence (max 15 words).
 Focus on what it explains or enables.
 
 Title: {section.title}
 Content:
-{section.content[:2000]}
+{section.content[:MAX_PROMPT_CONTENT]}
 
 One-line summary:"""
 
@@ -113,21 +121,79 @@ One-line summary:"""
 
         return _fallback_summary(section)
 
+    async def summarize_sections(self, sections: list[Section]) -> list[str]:
+        """
+        Generate one-line summaries for several sections with a single request.
+
+        The model is asked for a JSON array of summaries keyed by position.
+        Sections it leaves out fall back to Anthropic, then to the first
+        content line. Returns summaries in the order of the given sections.
+        """
+        if len(sections) == 1:
+            return [await self.summarize_section(sections[0])]
+
+        summaries = [_quick_summary(s) for s in sections]
+        pending = [i for i, summary in enumerate(summaries) if summary is None]
+        if pending:
+            prompt = _batch_prompt([sections[i] for i in pending])
+            max_tokens = TOKENS_PER_SUMMARY * len(pending)
+
+            parsed: dict[int, str] = {}
+            if self.use_ollama:
+                parsed = _parse_batch_response(
+                    await self._ollama_summarize(prompt, max_tokens=max_tokens), len(pending)
+                )
+            if len(parsed) < len(pending) and self.api_key:
+                retried = _parse_batch_response(
+                    await self._anthropic_summarize(prompt, max_tokens=max_tokens), len(pending)
+                )
+                parsed = {**retried, **parsed}
+
+            for n, i in enumerate(pending):
+                summaries[i] = parsed.get(n) or _fallback_summary(sections[i])
+
+        return summaries
+
+    async def _summarize_group_into(self, sections: list[Section], semaphore: asyncio.Semaphore) -> None:
+        """Summarize a group of sections in place, holding the semaphore while the request runs."""
+        async with semaphore:
+            summaries = await self.summarize_sections(sections)
+        for section, summary in zip(sections, summaries):
+            section.summary = summary
+
+    def _schedule(self, sections: list[Section], semaphore: asyncio.Semaphore) -> list[asyncio.Task]:
+        """
+        Start summarizing sections, one task per packed request.
+
+        Sections that need no model call are summarized immediately; the
+        rest are grouped into requests of at most SECTIONS_PER_REQUEST
+        sections and REQUEST_CHAR_BUDGET characters of content.
+        """
+        needs_model: list[Section] = []
+        for section in sections:
+            quick = _quick_summary(section)
+            if quick is None:
+                needs_model.append(section)
+            else:
+                section.summary = quick
+
+        return [
+            asyncio.create_task(self._summarize_group_into(group, semaphore))
+            for group in _group_sections(needs_model)
+        ]
+
     async def summarize_batch(
         self,
         sections: list[Section],
     ) -> list[Section]:
         """
         Generate summaries for multiple sections concurrently.
-        Uses a semaphore to limit parallel requests.
+        Sections are packed several to a request, and a semaphore limits
+        parallel requests.
         """
         semaphore = asyncio.Semaphore(self.concurrency)
 
-        async def _summarize_one(section: Section) -> None:
-            async with semaphore:
-                section.summary = await self.summarize_section(section)
-
-        await asyncio.gather(*[_summarize_one(s) for s in sections])
+        await asyncio.gather(*self._schedule(sections, semaphore))
 
         try:
             await self.close()
@@ -136,6 +202,29 @@ One-line summary:"""
 
         return sections
 
+    async def summarize_queue(self, queue: "asyncio.Queue[Optional[list[Section]]]") -> None:
+        """
+        Summarize section batches from a queue until a None sentinel arrives.
+
+        Each batch is dispatched as soon as it is queued, so summarization
+        overlaps with whatever is producing the batches. All batches share
+        one semaphore to limit parallel requests.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: list[asyncio.Task] = []
+
+        try:
+            while (batch := await queue.get()) is not None:
+                tasks.extend(self._schedule(batch, semaphore))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            try:
+                await self.close()
+            except Exception:
+                pass
+
 
 def summarize_sections_simple(sections: list[Section]) -> list[Section]:
     """Simple keyword-based summarization without AI."""
@@ -144,6 +233,88 @@ def summarize_sections_simple(sections: list[Section]) -> list[Section]:
     return sections
 
 
+def _quick_summary(section: Section) -> Optional[str]:
+    """Summary for sections that need no AI call, or None if one is needed."""
+    if not section.content.strip():
+        return ""
+
+    # Skip very short sections — no AI needed
+    if section.line_count < 3:
+        return section.content.strip()[:100]
+
+    return None
+
+
+def _group_sections(sections: list[Section]) -> list[list[Section]]:
+    """Split sections into request-sized groups, keeping document order."""
+    groups: list[list[Section]] = []
+    group: list[Section] = []
+    group_chars = 0
+    for section in sections:
+        chars = min(len(section.content), MAX_PROMPT_CONTENT)
+        if group and (len(group) >= SECTIONS_PER_REQUEST or group_chars + chars > REQUEST_CHAR_BUDGET):
+            groups.append(group)
+            group = []
+            group_chars = 0
+        group.append(section)
+        group_chars += chars
+    if group:
+        groups.append(group)
+    return groups
+
+
+def _batch_prompt(sections: list[Section]) -> str:
+    """Build a prompt asking for one summary per section as a JSON array."""
+    parts = [
+        f"Summarize each of the following {len(sections)} documentation sections "
+        "in ONE short sentence (max 15 words). Focus on what each explains or enables.\n\n"
+        'Respond with only a JSON array of objects {"id": <section number>, "summary": "<summary>"}, '
+        "one per section.\n"
+    ]
+    for n, section in enumerate(sections):
+        parts.append(
+            f"\n[Section {n}]\nTitle: {section.title}\nContent:\n{section.content[:MAX_PROMPT_CONTENT]}\n"
+        )
+    return "".join(parts)
+
+
+def _parse_batch_response(text: str, count: int) -> dict[int, str]:
+    """
+    Parse a JSON array of {id, summary} objects, ignoring malformed entries.
+
+    The reply may wrap the array in prose containing other brackets, so each
+    "[" is tried in turn and the first array holding an object is used.
+    """
+    items = _find_object_array(text)
+    if items is None:
+        return {}
+
+    summaries: dict[int, str] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        section_number, summary = item.get("id"), item.get("summary")
+        if (isinstance(section_number, int) and 0 <= section_number < count
+                and isinstance(summary, str) and summary.strip()):
+            summaries[section_number] = summary.strip()
+    return summaries
+
+
+def _find_object_array(text: str) -> Optional[list]:
+    """Return the first JSON array in text that contains an object, if any."""
+    decoder = json.JSONDecoder()
+    start = text.find("[")
+    while start != -1:
+        try:
+            items, _ = decoder.raw_decode(text, start)
+        except ValueError:
+            items = None
+        if isinstance(items, list) and any(isinstance(item, dict) for item in items):
+            return items
+        start = text.find("[", start + 1)
+    return None
+
+
 def _fallback_summary(section: Section) -> str:
     """Extract first meaningful content line as summary."""
     for line in section.content.split('\n'):
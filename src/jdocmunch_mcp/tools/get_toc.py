@@ -1,6 +1,5 @@
 """Tool to get table of contents for a repository."""
 
-import fnmatch
 from typing import Optional
 
 from ..storage.index_store import IndexStore
@@ -20,23 +19,6 @@ def _resolve_repo(store: IndexStore, repo: str) -> tuple[Optional[str], Optional
     return owner, name, None
 
 
-def _filter_sections(
-    sections: list[dict],
-    path_prefix: Optional[str] = None,
-    max_depth: Optional[int] = None,
-    file_pattern: Optional[str] = None,
-) -> list[dict]:
-    """Filter sections by path prefix, depth, and file glob pattern."""
-    result = sections
-    if path_prefix:
-        result = [s for s in result if s["file"].startswith(path_prefix)]
-    if max_depth is not None:
-        result = [s for s in result if s["depth"] <= max_depth]
-    if file_pattern:
-        result = [s for s in result if fnmatch.fnmatch(s["file"], file_pattern)]
-    return result
-
-
 def _build_meta(index) -> dict:
     """Build standard _meta envelope from an index."""
     return {
@@ -46,6 +28,31 @@ def _build_meta(index) -> dict:
     }
 
 
+def _slim_entry(section: dict, include_summary: bool = False) -> dict:
+    """
+    Build the TOC entry for a stored section, with its summary if requested.
+
+    Size and offset fields default to 0 for older indexes that lack them.
+    """
+    entry = {
+        "id": section["id"],
+        "title": section["title"],
+        "depth": section["depth"],
+        "file": section["file"],
+        "line_count": section.get("line_count", 0),
+        "byte_offset": section.get("byte_offset", 0),
+        "byte_length": section.get("byte_length", 0),
+    }
+    if include_summary:
+        summary = section.get("summary")
+        if summary:
+            entry["summary"] = summary
+    parent = section.get("parent")
+    if parent:
+        entry["parent"] = parent
+    return entry
+
+
 def get_toc(
     repo: str,
     storage_path: Optional[str] = None,
@@ -77,26 +84,9 @@ def get_toc(
     if not index:
         return {"error": f"Repository not indexed: {owner}/{name}"}
 
-    # Apply filters
-    filtered = _filter_sections(index.sections, path_prefix, max_depth, file_pattern)
-
-    # Build hierarchical TOC
-    toc_entries = []
-    for section in filtered:
-        entry = {
-            "id": section["id"],
-            "title": section["title"],
-            "depth": section["depth"],
-            "file": section["file"],
-            "line_count": section["line_count"],
-            "byte_offset": section.get("byte_offset", 0),
-            "byte_length": section.get("byte_length", 0),
-        }
-        if include_summaries and section.get("summary"):
-            entry["summary"] = section["summary"]
-        if section.get("parent"):
-            entry["parent"] = section["parent"]
-        toc_entries.append(entry)
+    # filter_sections returns the stored list as-is when no filter is set
+    filtered = index.filter_sections(path_prefix, max_depth, file_pattern)
+    toc_entries = [_slim_entry(s, include_summaries) for s in filtered]
 
     return {
         "repo": index.repo,
@@ -198,7 +188,7 @@ def get_document_outline(
         return {"error": f"Repository not indexed: {owner}/{name}"}
 
     # Filter to sections from this file only
-    file_sections = [s for s in index.sections if s["file"] == file_path]
+    file_sections = index.file_sections(file_path)
     if not file_sections:
         return {"error": f"File not found in index: {file_path}"}
 
@@ -1,15 +1,18 @@
 """Tool to index a local codebase's documentation."""
 
-import hashlib
 import logging
 import os
 import subprocess
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Optional
 
-from ..parser.markdown import parse_markdown_to_sections, Section
+from ..hashing import content_hash
+from ..parser import parse_doc_to_sections
+from ..parser.markdown import Section
 from ..security import is_sensitive_filename, scan_content_for_secrets, validate_path_traversal
-from ..storage.index_store import IndexStore
+from ..storage.index_store import IndexStore, normalize_line_endings
 from ..summarizer.batch_summarize import BatchSummarizer, summarize_sections_simple
 
 logger = logging.getLogger(__name__)
@@ -45,6 +48,16 @@ SKIP_DIRS = {
 # File patterns to consider as documentation
 DOC_EXTENSIONS = ('.md', '.markdown', '.mdx', '.rst')
 
+# Worker threads used to scan directories concurrently
+CRAWL_WORKERS = 16
+
+# Directories a crawl worker scans before handing remaining subdirectories
+# back for distribution; amortizes per-task scheduling on large trees
+CRAWL_BATCH_DIRS = 64
+
+# Max worker threads used to read documentation files concurrently
+READ_WORKERS = 32
+
 
 def is_hidden_path(path: Path) -> bool:
     """Check if any component of the path is hidden (starts with .)."""
@@ -64,16 +77,22 @@ def _load_gitignore_spec(base_path: Path):
         return None
 
 
-def _compute_file_hash(file_path: Path) -> str:
-    """Compute SHA256 hash of a file's content."""
-    h = hashlib.sha256()
+def _read_doc_file(full_path: Path) -> Optional[tuple[str, str]]:
+    """
+    Read a documentation file as UTF-8 text along with its content hash.
+
+    The hash is taken over the bytes on disk from the same read, so each
+    file is only read once. Returns None if the file cannot be read.
+    """
     try:
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(8192), b''):
-                h.update(chunk)
+        with open(full_path, 'rb') as f:
+            data = f.read()
     except OSError:
-        return ''
-    return h.hexdigest()
+        return None
+    file_hash = content_hash(data)
+    content = data.decode('utf-8', errors='replace')
+    # Match text-mode universal newlines so byte offsets agree with the cached copy
+    return normalize_line_endings(content), file_hash
 
 
 def _get_local_commit_hash(base_path: Path) -> str:
@@ -121,6 +140,14 @@ def discover_local_doc_files(
 
     doc_files: list[str] = []
 
+    # Entry paths all start with this prefix, so relative paths are a slice
+    base_prefix_len = len(os.path.join(str(base), ''))
+
+    def relative_path(entry_path: str) -> str:
+        """Relative POSIX path of a scanned entry under base."""
+        rel_path = entry_path[base_prefix_len:]
+        return rel_path if os.sep == '/' else rel_path.replace(os.sep, '/')
+
     # Load .gitignore spec
     gitignore_spec = _load_gitignore_spec(base)
 
@@ -133,12 +160,12 @@ def discover_local_doc_files(
         except ImportError:
             pass
 
-    def should_skip_dir(dir_path: Path) -> bool:
+    def should_skip_dir(name: str) -> bool:
         """Check if a directory should be skipped."""
-        name = dir_path.name
         if name in SKIP_DIRS:
             return True
-        if not include_hidden and is_hidden_path(dir_path.relative_to(base)):
+        # Ancestors were already checked, so only this component can be hidden
+        if not include_hidden and name.startswith('.'):
             return True
         return False
 
@@ -150,62 +177,88 @@ def discover_local_doc_files(
             return True
         return False
 
-    def crawl_directory(current_path: Path, current_depth: int) -> None:
-        """Recursively crawl directory for markdown files."""
+    def crawl_directory(current_path: str, current_depth: int) -> tuple[list[str], list[tuple[str, int]]]:
+        """
+        Scan a single directory for markdown files.
+
+        Returns:
+            Tuple of (relative doc file paths, (subdirectory, depth) pairs to crawl next)
+        """
+        files: list[str] = []
+        subdirs: list[tuple[str, int]] = []
         if current_depth > max_depth:
-            return
+            return files, subdirs
 
         try:
-            for item in current_path.iterdir():
-                try:
-                    # P1-1: Symlink protection - resolve and validate
-                    resolved = item.resolve()
-                    if item.is_symlink():
-                        if not follow_symlinks:
-                            logger.debug("Skipping symlink: %s", item)
-                            continue
-                        if not validate_path_traversal(resolved, base):
-                            logger.warning("Symlink escapes base directory, skipping: %s -> %s", item, resolved)
-                            continue
-
-                    if item.is_file():
-                        # P1-1: Validate resolved file is within base
-                        if not validate_path_traversal(resolved, base):
-                            logger.warning("Path traversal detected, skipping: %s", item)
-                            continue
-
-                        if item.suffix.lower() in DOC_EXTENSIONS:
-                            rel_path = item.relative_to(base).as_posix()
-
-                            # P1-2: Skip sensitive files
-                            if is_sensitive_filename(rel_path):
-                                logger.info("Skipping sensitive file: %s", rel_path)
+            with os.scandir(current_path) as entries:
+                for entry in entries:
+                    try:
+                        # P1-1: Symlink protection - resolve and validate
+                        if entry.is_symlink():
+                            if not follow_symlinks:
+                                logger.debug("Skipping symlink: %s", entry.path)
                                 continue
-
-                            # P1-3: Respect .gitignore
-                            if is_gitignored(rel_path):
-                                logger.debug("Skipping gitignored file: %s", rel_path)
+                            resolved = Path(entry.path).resolve()
+                            if not validate_path_traversal(resolved, base):
+                                logger.warning("Symlink escapes base directory, skipping: %s -> %s", entry.path, resolved)
                                 continue
 
-                            doc_files.append(rel_path)
+                        if entry.is_file():
+                            if os.path.splitext(entry.name)[1].lower() in DOC_EXTENSIONS:
+                                rel_path = relative_path(entry.path)
+
+                                # P1-2: Skip sensitive files
+                                if is_sensitive_filename(rel_path):
+                                    logger.info("Skipping sensitive file: %s", rel_path)
+                                    continue
 
-                    elif item.is_dir():
-                        # P1-1: Validate resolved directory is within base
-                        if not validate_path_traversal(resolved, base):
-                            logger.warning("Directory symlink escapes base, skipping: %s", item)
-                            continue
+                                # P1-3: Respect .gitignore
+                                if is_gitignored(rel_path):
+                                    logger.debug("Skipping gitignored file: %s", rel_path)
+                                    continue
 
-                        if not should_skip_dir(item):
-                            rel_dir = item.relative_to(base).as_posix()
-                            if not is_gitignored(rel_dir + '/'):
-                                crawl_directory(item, current_depth + 1)
+                                files.append(rel_path)
 
-                except (OSError, PermissionError):
-                    continue
+                        elif entry.is_dir():
+                            if not should_skip_dir(entry.name):
+                                rel_dir = relative_path(entry.path)
+                                if not is_gitignored(rel_dir + '/'):
+                                    subdirs.append((entry.path, current_depth + 1))
+
+                    except (OSError, PermissionError):
+                        continue
         except (OSError, PermissionError):
             pass
 
-    crawl_directory(base, 0)
+        return files, subdirs
+
+    def crawl_batch(start_path: str, start_depth: int) -> tuple[list[str], list[tuple[str, int]]]:
+        """
+        Scan a directory and keep descending breadth-first, up to CRAWL_BATCH_DIRS directories.
+
+        Returns:
+            Tuple of (relative doc file paths, (subdirectory, depth) pairs still to crawl)
+        """
+        files: list[str] = []
+        queue: deque[tuple[str, int]] = deque([(start_path, start_depth)])
+        for _ in range(CRAWL_BATCH_DIRS):
+            if not queue:
+                break
+            dir_files, subdirs = crawl_directory(*queue.popleft())
+            files.extend(dir_files)
+            queue.extend(subdirs)
+        return files, list(queue)
+
+    # Scan directories concurrently; results are merged on this thread
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+        pending = {executor.submit(crawl_batch, str(base), 0)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                doc_files.extend(files)
+                for subdir, depth in subdirs:
+                    pending.add(executor.submit(crawl_batch, subdir, depth))
 
     # Sort for consistent ordering
     doc_files.sort()
@@ -295,15 +348,20 @@ async def index_local(
     file_hashes: dict[str, str] = {}
     commit_hash = _get_local_commit_hash(base_path)
 
-    # Read and parse all files
+    # Read and parse all files, staging raw content as it is parsed
+    store = IndexStore(storage_path)
+    store.discard_staged(owner, repo_name)
     all_sections: list[Section] = []
-    raw_files: dict[str, str] = {}
     skipped_secrets: list[str] = []
 
-    for file_path in doc_files:
-        full_path = base_path / file_path
-        try:
-            content = full_path.read_text(encoding='utf-8', errors='replace')
+    # Reads release the GIL, so overlap them on a thread pool; parse on this thread
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(doc_files))) as executor:
+        results = executor.map(_read_doc_file, [base_path / fp for fp in doc_files])
+
+        for file_path, result in zip(doc_files, results):
+            if result is None:
+                continue
+            content, file_hash = result
 
             # P1-2: Scan content for secrets
             detected = scan_content_for_secrets(content, file_path)
@@ -312,27 +370,17 @@ async def index_local(
                 skipped_secrets.append(file_path)
                 continue
 
-            raw_files[file_path] = content
+            store.stage_raw_file(owner, repo_name, file_path, content)
 
             # P1-4: Compute file hash
-            file_hashes[file_path] = _compute_file_hash(full_path)
+            file_hashes[file_path] = file_hash
 
             # Dispatch to correct parser by extension
-            ext = Path(file_path).suffix.lower()
-            if ext == '.rst':
-                from ..parser.rst import parse_rst_to_sections
-                sections = parse_rst_to_sections(content, file_path)
-            elif ext == '.mdx':
-                from ..parser.markdown import preprocess_mdx
-                processed = preprocess_mdx(content)
-                sections = parse_markdown_to_sections(processed, file_path)
-            else:
-                sections = parse_markdown_to_sections(content, file_path)
+            sections = parse_doc_to_sections(content, file_path)
             all_sections.extend(sections)
-        except (OSError, UnicodeDecodeError):
-            continue
 
     if not all_sections:
+        store.discard_staged(owner, repo_name)
         return {
             "success": False,
             "error": "No sections extracted from documentation",
@@ -350,10 +398,9 @@ async def index_local(
         # In local-only mode, use simple summaries (no Anthropic API)
         all_sections = summarize_sections_simple(all_sections)
 
-    # Save index
-    store = IndexStore(storage_path)
+    # Save index (raw files were staged as they were parsed)
     index = store.save_index(
-        owner, repo_name, doc_files, all_sections, raw_files,
+        owner, repo_name, doc_files, all_sections,
         commit_hash=commit_hash,
         file_hashes=file_hashes,
     )
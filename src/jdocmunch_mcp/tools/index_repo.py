@@ -1,30 +1,49 @@
 """Tool to index a GitHub repository's documentation."""
 
-import hashlib
+import asyncio
 import logging
 import os
 import re
-from typing import Optional
+import tarfile
+import tempfile
+from typing import IO, Optional
 
 import httpx
 
-from ..parser.markdown import parse_markdown_to_sections, Section
+from ..hashing import content_hash
+from ..parser import parse_doc_to_sections
+from ..parser.markdown import Section
 from ..security import is_sensitive_filename, scan_content_for_secrets
-from ..storage.index_store import IndexStore
+from ..storage.index_store import IndexStore, normalize_line_endings
 from ..summarizer.batch_summarize import BatchSummarizer, summarize_sections_simple
 
 logger = logging.getLogger(__name__)
 
+# Max concurrent GitHub file fetches
+DEFAULT_FETCH_CONCURRENCY = 20
+
+# Accepted repository URL forms
+_GITHUB_URL_PATTERNS = (
+    re.compile(r"github\.com/([^/]+)/([^/]+)"),  # https://github.com/owner/repo
+    re.compile(r"^([^/]+)/([^/]+)$"),  # owner/repo
+)
+
+# Sections handed to the AI summarizer per batch while parsing continues
+SUMMARY_BATCH_SIZE = 64
+
+# Re-indexes touching fewer files than this fetch them individually
+# rather than downloading the whole repository tarball
+INCREMENTAL_TARBALL_MIN_FILES = 10
+
+# Tarballs larger than this are spooled to a temporary file instead of memory
+TARBALL_SPOOL_SIZE = 64 * 1024 * 1024
+
 
 def parse_github_url(url: str) -> tuple[str, str]:
     """Extract owner and repo name from GitHub URL."""
-    patterns = [
-        r"github\.com/([^/]+)/([^/]+)",  # https://github.com/owner/repo
-        r"^([^/]+)/([^/]+)$",  # owner/repo
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url.strip().rstrip('/'))
+    cleaned = url.strip().rstrip('/')
+    for pattern in _GITHUB_URL_PATTERNS:
+        match = pattern.search(cleaned)
         if match:
             owner = match.group(1)
             repo = match.group(2)
@@ -35,6 +54,7 @@ def parse_github_url(url: str) -> tuple[str, str]:
 
 
 async def fetch_file_content(
+    client: httpx.AsyncClient,
     owner: str,
     repo: str,
     path: str,
@@ -50,13 +70,129 @@ async def fetch_file_content(
 
     url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        response.raise_for_status()
-        return response.text
+    response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    return response.text
+
+
+async def fetch_files(
+    client: httpx.AsyncClient,
+    owner: str,
+    repo: str,
+    paths: list[str],
+    token: Optional[str] = None,
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+) -> dict[str, str]:
+    """
+    Fetch many files concurrently over a shared client.
+
+    Uses a semaphore to limit in-flight requests. Files that fail to
+    download are logged and left out of the result.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _fetch_one(path: str) -> str:
+        async with semaphore:
+            return await fetch_file_content(client, owner, repo, path, token)
+
+    results = await asyncio.gather(*[_fetch_one(p) for p in paths], return_exceptions=True)
+
+    contents: dict[str, str] = {}
+    for path, result in zip(paths, results):
+        if isinstance(result, BaseException):
+            logger.warning("Failed to fetch %s: %s", path, result)
+            continue
+        contents[path] = result
+    return contents
+
+
+async def fetch_repo_tarball(
+    client: httpx.AsyncClient,
+    owner: str,
+    repo: str,
+    ref: str = "HEAD",
+    token: Optional[str] = None,
+) -> IO[bytes]:
+    """
+    Download a gzipped tarball of the repository at the given ref.
+
+    Returns a spooled temporary file positioned at the start; the caller
+    is responsible for closing it.
+    """
+    headers = {
+        "Accept": "application/vnd.github.v3+json",
+        "User-Agent": "jdocmunch-mcp",
+    }
+    if token:
+        headers["Authorization"] = f"token {token}"
+
+    url = f"https://api.github.com/repos/{owner}/{repo}/tarball/{ref}"
+
+    spool = tempfile.SpooledTemporaryFile(max_size=TARBALL_SPOOL_SIZE)
+    try:
+        async with client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def extract_doc_files(tarball: IO[bytes], paths: list[str]) -> dict[str, str]:
+    """
+    Extract the given repository paths from a GitHub tarball.
+
+    GitHub prefixes every member with a single "{owner}-{repo}-{sha}/"
+    directory, which is stripped before matching against paths.
+    """
+    wanted = set(paths)
+    contents: dict[str, str] = {}
+    with tarfile.open(fileobj=tarball, mode="r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            _, _, path = member.name.partition("/")
+            if path not in wanted:
+                continue
+            f = tar.extractfile(member)
+            if f is not None:
+                contents[path] = f.read().decode("utf-8", "replace")
+    return contents
+
+
+async def fetch_doc_contents(
+    client: httpx.AsyncClient,
+    owner: str,
+    repo: str,
+    paths: list[str],
+    ref: str = "HEAD",
+    token: Optional[str] = None,
+) -> dict[str, str]:
+    """
+    Fetch documentation file contents, preferring a single tarball download.
+
+    Any paths the tarball could not provide (or all of them, if the
+    download fails) are fetched individually through the Contents API.
+    """
+    contents: dict[str, str] = {}
+    try:
+        tarball = await fetch_repo_tarball(client, owner, repo, ref, token)
+        with tarball:
+            contents = await asyncio.to_thread(extract_doc_files, tarball, paths)
+    except (httpx.HTTPError, tarfile.TarError, OSError) as e:
+        logger.warning("Tarball download failed for %s/%s: %s", owner, repo, e)
+
+    missing = [p for p in paths if p not in contents]
+    if missing:
+        contents.update(await fetch_files(client, owner, repo, missing, token))
+    return contents
 
 
 async def _fetch_commit_sha(
+    client: httpx.AsyncClient,
     owner: str,
     repo: str,
     token: Optional[str] = None,
@@ -72,17 +208,17 @@ async def _fetch_commit_sha(
     url = f"https://api.github.com/repos/{owner}/{repo}/commits/HEAD"
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("sha", "")
+        response = await client.get(url, headers=headers)
+        if response.status_code == 200:
+            data = response.json()
+            return data.get("sha", "")
     except Exception:
         pass
     return ""
 
 
 async def discover_doc_files(
+    client: httpx.AsyncClient,
     owner: str,
     repo: str,
     token: Optional[str] = None,
@@ -104,12 +240,11 @@ async def discover_doc_files(
 
     url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/HEAD?recursive=1"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        if response.status_code == 404:
-            return [], {}
-        response.raise_for_status()
-        data = response.json()
+    response = await client.get(url, headers=headers)
+    if response.status_code == 404:
+        return [], {}
+    response.raise_for_status()
+    data = response.json()
 
     doc_files: list[str] = []
     blob_shas: dict[str, str] = {}
@@ -134,15 +269,21 @@ async def index_repo(
     use_ai_summaries: bool = True,
     github_token: Optional[str] = None,
     storage_path: Optional[str] = None,
+    incremental: bool = True,
 ) -> dict:
     """
     Index a GitHub repository's documentation.
 
+    When the repository is already indexed, files whose git blob SHA is
+    unchanged keep their sections and summaries; only new or modified
+    files are fetched, parsed, and summarized.
+
     Args:
         url: GitHub repository URL or owner/repo string
         use_ai_summaries: Whether to use AI for generating summaries
         github_token: GitHub personal access token (for private repos)
         storage_path: Custom storage path (defaults to ~/.doc-index)
+        incremental: Reuse sections of unchanged files from an existing index
 
     Returns:
         Dict with indexing statistics
@@ -161,91 +302,183 @@ async def index_repo(
     # Get token from env if not provided
     token = github_token or os.environ.get("GITHUB_TOKEN")
 
-    # Discover documentation files (now also returns blob SHAs)
-    doc_files, blob_shas = await discover_doc_files(owner, repo, token)
-
-    if not doc_files:
-        return {
-            "success": False,
-            "error": "No documentation files found",
-            "repo": f"{owner}/{repo}",
-        }
-
-    # P1-4: Fetch commit SHA
-    commit_hash = await _fetch_commit_sha(owner, repo, token)
-
-    # Fetch and parse all files
+    store = IndexStore(storage_path)
+    previous = None
+    if incremental:
+        try:
+            previous = store.load_index(owner, repo)
+        except (ValueError, OSError) as e:
+            # An unreadable index is rebuilt from scratch
+            logger.warning("Could not read existing index for %s/%s: %s", owner, repo, e)
+
+    limits = httpx.Limits(
+        max_connections=DEFAULT_FETCH_CONCURRENCY,
+        max_keepalive_connections=DEFAULT_FETCH_CONCURRENCY,
+    )
+    async with httpx.AsyncClient(limits=limits) as client:
+        # Discover documentation files (with blob SHAs) and fetch commit SHA concurrently
+        (doc_files, blob_shas), commit_hash = await asyncio.gather(
+            discover_doc_files(client, owner, repo, token),
+            _fetch_commit_sha(client, owner, repo, token),
+        )
+
+        if not doc_files:
+            return {
+                "success": False,
+                "error": "No documentation files found",
+                "repo": f"{owner}/{repo}",
+            }
+
+        # Files whose blob SHA matches the existing index are not fetched again
+        unchanged: set[str] = set()
+        if previous is not None:
+            unchanged = {
+                p for p in doc_files
+                if blob_shas.get(p) and previous.file_hashes.get(p) == blob_shas[p]
+            }
+        to_fetch = [p for p in doc_files if p not in unchanged]
+
+        # Fetch new and changed files (one tarball request, per-file fallback);
+        # a handful of changed files is cheaper to fetch one by one
+        contents: dict[str, str] = {}
+        if previous is not None and len(to_fetch) < INCREMENTAL_TARBALL_MIN_FILES:
+            contents = await fetch_files(client, owner, repo, to_fetch, token)
+        elif to_fetch:
+            contents = await fetch_doc_contents(
+                client, owner, repo, to_fetch, ref=commit_hash or "HEAD", token=token,
+            )
+
+    # Parse fetched files, feeding AI summarization as batches become ready and
+    # staging raw content so each file's text can be released once parsed
+    store.discard_staged(owner, repo)
     all_sections: list[Section] = []
-    raw_files: dict[str, str] = {}
     file_hashes: dict[str, str] = {}
     skipped_secrets: list[str] = []
 
-    for file_path in doc_files:
-        try:
-            content = await fetch_file_content(owner, repo, file_path, token)
+    summary_queue: asyncio.Queue[Optional[list[Section]]] = asyncio.Queue()
+    summary_task: Optional[asyncio.Task] = None
+    if use_ai_summaries:
+        summary_task = asyncio.create_task(BatchSummarizer().summarize_queue(summary_queue))
+    pending_batch: list[Section] = []
 
-            # P1-2: Scan content for secrets
-            detected = scan_content_for_secrets(content, file_path)
-            if detected:
-                logger.warning("Secret detected in %s: %s — skipping file", file_path, ', '.join(detected))
-                skipped_secrets.append(file_path)
+    parsed = False
+    try:
+        for file_path in to_fetch:
+            content = contents.pop(file_path, None)
+            if content is None:
+                continue
+            # Parse the same text that is cached, so byte offsets line up
+            content = normalize_line_endings(content)
+            try:
+                # P1-2: Scan content for secrets
+                detected = scan_content_for_secrets(content, file_path)
+                if detected:
+                    logger.warning("Secret detected in %s: %s — skipping file", file_path, ', '.join(detected))
+                    skipped_secrets.append(file_path)
+                    continue
+
+                # Dispatch to correct parser by extension
+                sections = parse_doc_to_sections(content, file_path)
+            except Exception:
+                continue
+            if not sections:
                 continue
 
-            raw_files[file_path] = content
+            # Only files that produced sections are cached and recorded
+            store.stage_raw_file(owner, repo, file_path, content)
 
             # Use blob SHA from git tree as file hash (more efficient than re-hashing)
-            file_hashes[file_path] = blob_shas.get(file_path, hashlib.sha256(content.encode()).hexdigest())
-
-            # Dispatch to correct parser by extension
-            from pathlib import Path as _Path
-            ext = _Path(file_path).suffix.lower()
-            if ext == '.rst':
-                from ..parser.rst import parse_rst_to_sections
-                sections = parse_rst_to_sections(content, file_path)
-            elif ext == '.mdx':
-                from ..parser.markdown import preprocess_mdx
-                processed = preprocess_mdx(content)
-                sections = parse_markdown_to_sections(processed, file_path)
+            # (the fallback hash is only computed when the tree had no SHA for the path)
+            if file_path in blob_shas:
+                file_hashes[file_path] = blob_shas[file_path]
             else:
-                sections = parse_markdown_to_sections(content, file_path)
+                file_hashes[file_path] = content_hash(content.encode())
             all_sections.extend(sections)
-        except Exception:
-            continue
 
-    if not all_sections:
-        return {
-            "success": False,
-            "error": "No sections extracted from documentation",
-            "repo": f"{owner}/{repo}",
-        }
+            if summary_task is not None:
+                pending_batch.extend(sections)
+                if len(pending_batch) >= SUMMARY_BATCH_SIZE:
+                    summary_queue.put_nowait(pending_batch)
+                    pending_batch = []
+                    # Let queued summary requests start before parsing more files
+                    await asyncio.sleep(0)
+        parsed = True
+    finally:
+        if not parsed:
+            # Don't leave the summarizer (and its HTTP client) or staged files behind
+            if summary_task is not None:
+                summary_task.cancel()
+                await asyncio.gather(summary_task, return_exceptions=True)
+            store.discard_staged(owner, repo)
 
     # Generate summaries
-    if use_ai_summaries:
+    if summary_task is not None:
+        if pending_batch:
+            summary_queue.put_nowait(pending_batch)
+        summary_queue.put_nowait(None)
         try:
-            summarizer = BatchSummarizer()
-            all_sections = await summarizer.summarize_batch(all_sections)
+            await summary_task
         except Exception:
             all_sections = summarize_sections_simple(all_sections)
     else:
         all_sections = summarize_sections_simple(all_sections)
 
-    # Save index
-    store = IndexStore(storage_path)
-    index = store.save_index(
-        owner, repo, doc_files, all_sections, raw_files,
-        commit_hash=commit_hash,
-        file_hashes=file_hashes,
-    )
+    kept_sections = 0
+    if previous is not None:
+        kept_sections = sum(1 for s in previous.sections if s["file"] in unchanged)
+
+    if not all_sections and not kept_sections:
+        store.discard_staged(owner, repo)
+        return {
+            "success": False,
+            "error": "No sections extracted from documentation",
+            "repo": f"{owner}/{repo}",
+        }
+
+    # Save index (raw files were staged as they were parsed)
+    if previous is None:
+        index = store.save_index(
+            owner, repo, doc_files, all_sections,
+            commit_hash=commit_hash,
+            file_hashes=file_hashes,
+        )
+    else:
+        new_sections_by_file: dict[str, list[Section]] = {}
+        for section in all_sections:
+            new_sections_by_file.setdefault(section.file, []).append(section)
+        # Previously indexed files that are gone, unreadable, or no longer
+        # produce sections (secrets, parse failures) lose their sections and hashes
+        deleted_files = [
+            p for p in previous.doc_files
+            if p not in unchanged and p not in new_sections_by_file
+        ]
+        index = store.update_index(
+            owner, repo,
+            changed_files={},
+            deleted_files=deleted_files,
+            new_sections_by_file=new_sections_by_file,
+            new_file_hashes=file_hashes,
+            commit_hash=commit_hash,
+            doc_files=doc_files,
+        )
+        if index is None:
+            return {
+                "success": False,
+                "error": "Existing index was removed during re-indexing",
+                "repo": f"{owner}/{repo}",
+            }
 
     result = {
         "success": True,
         "repo": f"{owner}/{repo}",
         "indexed_at": index.indexed_at,
-        "file_count": len(doc_files),
-        "section_count": len(all_sections),
-        "files": doc_files,
+        "file_count": len(index.doc_files),
+        "section_count": len(index.sections),
+        "files": index.doc_files,
         "commit_hash": commit_hash,
     }
+    if previous is not None:
+        result["unchanged_files"] = len(unchanged)
     if skipped_secrets:
         result["skipped_secrets"] = skipped_secrets
     return result
@@ -1,6 +1,5 @@
 """Tool to search sections within a repository."""
 
-import fnmatch
 from typing import Optional
 
 from ..storage.index_store import IndexStore
@@ -46,18 +45,14 @@ def search_sections(
     if not index:
         return {"error": f"Repository not indexed: {owner}/{name}"}
 
-    # Search
-    matches = index.search(query)
-
-    # Apply filters
-    if path_prefix:
-        matches = [m for m in matches if m["file"].startswith(path_prefix)]
-    if max_depth is not None:
-        matches = [m for m in matches if m["depth"] <= max_depth]
-    if file_pattern:
-        matches = [m for m in matches if fnmatch.fnmatch(m["file"], file_pattern)]
-
-    matches = matches[:max_results]
+    # Search, with filters applied before scoring and only the top results kept
+    matches = index.search(
+        query,
+        path_prefix=path_prefix,
+        max_depth=max_depth,
+        file_pattern=file_pattern,
+        max_results=max_results,
+    )
 
     return {
         "repo": index.repo,
@@ -0,0 +1,26 @@
+"""Tests for content hashing."""
+
+import hashlib
+
+from jdocmunch_mcp import hashing
+from jdocmunch_mcp.hashing import content_hash, HASH_ALGORITHM_ENV
+
+
+class TestContentHash:
+    def test_sha256_default(self, monkeypatch):
+        monkeypatch.delenv(HASH_ALGORITHM_ENV, raising=False)
+        assert content_hash(b"# Doc\n") == hashlib.sha256(b"# Doc\n").hexdigest()
+
+    def test_unavailable_algorithm_falls_back(self, monkeypatch):
+        monkeypatch.setenv(HASH_ALGORITHM_ENV, "no-such-hash")
+        assert content_hash(b"# Doc\n") == hashlib.sha256(b"# Doc\n").hexdigest()
+
+    def test_fast_algorithms_are_prefixed(self, monkeypatch):
+        for algorithm, module in (("blake3", hashing.blake3), ("xxh3", hashing.xxhash)):
+            if module is None:
+                continue
+            monkeypatch.setenv(HASH_ALGORITHM_ENV, algorithm.upper())
+            digest = content_hash(b"# Doc\n")
+            assert digest.startswith(f"{algorithm}:")
+            assert digest == content_hash(b"# Doc\n")
+            assert digest != content_hash(b"# Doc!\n")
@@ -10,19 +10,19 @@ from jdocmunch_mcp.parser.markdown import (
     _strip_front_matter,
     _content_hash_suffix,
 )
+from jdocmunch_mcp.parser import parse_doc_to_sections
 from jdocmunch_mcp.parser.rst import parse_rst_to_sections
-from jdocmunch_mcp.parser.hierarchy import build_section_tree, flatten_tree, get_section_path
+from jdocmunch_mcp.parser.hierarchy import flatten_tree, get_section_path
 
 
 class TestSlugify:
-    def test_basic(self):
-        assert slugify("Hello World") == "hello-world"
-
-    def test_special_chars(self):
-        assert slugify("API Reference (v2)") == "api-reference-v2"
-
-    def test_multiple_spaces(self):
-        assert slugify("  extra   spaces  ") == "extra-spaces"
+    @pytest.mark.parametrize("text,expected", [
+        ("Hello World", "hello-world"),
+        ("API Reference (v2)", "api-reference-v2"),
+        ("  extra   spaces  ", "extra-spaces"),
+    ])
+    def test_slugify(self, text, expected):
+        assert slugify(text) == expected
 
 
 class TestExtractKeywords:
@@ -44,6 +44,10 @@ class TestExtractKeywords:
         assert "deploy" in keywords
         assert "build" in keywords
 
+    def test_tech_terms_whole_words_any_case(self):
+        keywords = extract_keywords("DEBUG the Config module. Logging and tokens are ignored.")
+        assert keywords == ["config", "debug", "module"]
+
 
 class TestStripFrontMatter:
     def test_with_front_matter(self):
@@ -66,16 +70,16 @@ class TestStripFrontMatter:
 
 
 class TestParseMarkdown:
-    def test_basic_sections(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
+    def test_basic_sections(self, parsed_sample_markdown):
+        sections = parsed_sample_markdown
         assert len(sections) > 0
-        titles = [s.title for s in sections]
+        titles = {s.title for s in sections}
         assert "Getting Started" in titles
         assert "Installation" in titles
         assert "Configuration" in titles
 
-    def test_section_depth(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
+    def test_section_depth(self, parsed_sample_markdown):
+        sections = parsed_sample_markdown
         for s in sections:
             if s.title == "Getting Started":
                 assert s.depth == 1
@@ -84,8 +88,8 @@ class TestParseMarkdown:
             elif s.title == "Basic Config":
                 assert s.depth == 3
 
-    def test_section_ids_unique(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
+    def test_section_ids_unique(self, parsed_sample_markdown):
+        sections = parsed_sample_markdown
         ids = [s.id for s in sections]
         assert len(ids) == len(set(ids)), f"Duplicate IDs: {ids}"
 
@@ -97,8 +101,8 @@ class TestParseMarkdown:
         # The two "Section A" sections should have different IDs
         assert len(ids_v1) == len(set(ids_v1))
 
-    def test_parent_relationships(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
+    def test_parent_relationships(self, parsed_sample_markdown):
+        sections = parsed_sample_markdown
         section_map = {s.id: s for s in sections}
         for s in sections:
             if s.parent:
@@ -106,15 +110,24 @@ class TestParseMarkdown:
                 assert parent is not None, f"Parent {s.parent} not found for {s.id}"
                 assert parent.depth < s.depth
 
-    def test_byte_offset_and_length(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
+    def test_byte_offset_and_length(self, parsed_sample_markdown):
+        sections = parsed_sample_markdown
         for s in sections:
             assert s.byte_length > 0
             # Content encoded length should match byte_length
             assert len(s.content.encode('utf-8')) == s.byte_length
 
-    def test_keywords_extracted(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
+    def test_byte_offsets_non_ascii(self):
+        content = "Intro é.\n\n# Café\n\nNaïve text.\n#\nnot a header\n## Über\n\nEnd.\n"
+        raw = content.encode('utf-8')
+        sections = parse_markdown_to_sections(content, "doc.md")
+        assert [s.title for s in sections] == ["doc.md", "Café", "Über"]
+        for s in sections:
+            assert raw[s.byte_offset:s.byte_offset + s.byte_length].decode('utf-8') == s.content
+            assert s.line_count == len(s.content.split('\n'))
+
+    def test_keywords_extracted(self, parsed_sample_markdown):
+        sections = parsed_sample_markdown
         # At least some sections should have keywords
         all_keywords = []
         for s in sections:
@@ -143,17 +156,22 @@ class TestHeadinglessParsing:
         assert len(sections) >= 1
         assert sections[0].title == "My Special Document"
 
-    def test_long_headingless_splits(self):
+    def test_long_headingless_splits(self, long_headingless_content):
         """Files > 200 lines should be split on double-blank-line boundaries."""
+        sections = parse_markdown_to_sections(long_headingless_content, "long.md")
+        assert len(sections) > 1
+
+    def test_long_headingless_byte_offsets(self):
         lines = []
         for i in range(25):
-            for j in range(10):
-                lines.append(f"Paragraph {i} line {j} with some content.")
-            lines.append("")
-            lines.append("")  # Double blank line
+            lines.extend(f"Paragraphe {i} ligne {j} — été." for j in range(10))
+            lines.extend(["", ""])
         content = "\n".join(lines)
+        raw = content.encode('utf-8')
         sections = parse_markdown_to_sections(content, "long.md")
         assert len(sections) > 1
+        for s in sections:
+            assert raw[s.byte_offset:s.byte_offset + s.byte_length].decode('utf-8') == s.content
 
 
 class TestPreprocessMdx:
@@ -187,25 +205,33 @@ class TestPreprocessMdx:
         result = preprocess_mdx(content)
         assert "export" not in result
 
-    def test_full_mdx(self, sample_mdx):
-        result = preprocess_mdx(sample_mdx)
-        sections = parse_markdown_to_sections(result, "guide.mdx")
+    def test_full_mdx(self, mdx_sections):
+        sections = mdx_sections
         assert len(sections) > 0
-        titles = [s.title for s in sections]
+        titles = {s.title for s in sections}
         assert "Component Guide" in titles
 
 
+class TestParseDocDispatch:
+    def test_dispatch_by_extension(self, sample_markdown, sample_mdx, sample_rst, mdx_sections):
+        assert parse_doc_to_sections(sample_rst, "docs/Guide.RST") == parse_rst_to_sections(sample_rst, "docs/Guide.RST")
+        assert parse_doc_to_sections(sample_mdx, "guide.mdx") == mdx_sections
+        assert parse_doc_to_sections(sample_markdown, "README.markdown") == parse_markdown_to_sections(
+            sample_markdown, "README.markdown"
+        )
+
+
 class TestRstParser:
-    def test_basic_headers(self, sample_rst):
-        sections = parse_rst_to_sections(sample_rst, "guide.rst")
+    def test_basic_headers(self, parsed_sample_rst):
+        sections = parsed_sample_rst
         assert len(sections) > 0
-        titles = [s.title for s in sections]
+        titles = {s.title for s in sections}
         assert "User Guide" in titles
         assert "Installation" in titles
         assert "Configuration" in titles
 
-    def test_depth_by_underline_order(self, sample_rst):
-        sections = parse_rst_to_sections(sample_rst, "guide.rst")
+    def test_depth_by_underline_order(self, parsed_sample_rst):
+        sections = parsed_sample_rst
         section_map = {s.title: s for s in sections}
         # "User Guide" uses overline === so depth 1
         # "Installation" uses === so depth 2
@@ -215,8 +241,8 @@ class TestRstParser:
         assert section_map["Installation"].depth < section_map["Basic Setup"].depth
         assert section_map["Basic Setup"].depth < section_map["Nested Section"].depth
 
-    def test_unique_ids(self, sample_rst):
-        sections = parse_rst_to_sections(sample_rst, "guide.rst")
+    def test_unique_ids(self, parsed_sample_rst):
+        sections = parsed_sample_rst
         ids = [s.id for s in sections]
         assert len(ids) == len(set(ids))
 
@@ -226,8 +252,8 @@ class TestRstParser:
         assert len(sections) == 1
         assert sections[0].depth == 0
 
-    def test_parent_relationships(self, sample_rst):
-        sections = parse_rst_to_sections(sample_rst, "guide.rst")
+    def test_parent_relationships(self, parsed_sample_rst):
+        sections = parsed_sample_rst
         section_map = {s.id: s for s in sections}
         for s in sections:
             if s.parent:
@@ -237,19 +263,15 @@ class TestRstParser:
 
 
 class TestHierarchy:
-    def test_build_tree(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
-        tree = build_section_tree(sections)
-        assert len(tree) > 0
-
-    def test_flatten_tree_roundtrip(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
-        tree = build_section_tree(sections)
-        flat = flatten_tree(tree)
-        assert len(flat) == len(sections)
-
-    def test_get_section_path(self, sample_markdown):
-        sections = parse_markdown_to_sections(sample_markdown, "README.md")
+    def test_build_tree(self, sample_tree):
+        assert len(sample_tree) > 0
+
+    def test_flatten_tree_roundtrip(self, parsed_sample_markdown, sample_tree):
+        flat = flatten_tree(sample_tree)
+        assert len(flat) == len(parsed_sample_markdown)
+
+    def test_get_section_path(self, parsed_sample_markdown):
+        sections = parsed_sample_markdown
         # Find a deep section
         deep = [s for s in sections if s.depth >= 3]
         if deep:
@@ -259,11 +281,12 @@ class TestHierarchy:
 
 
 class TestContentHashSuffix:
-    def test_deterministic(self):
-        assert _content_hash_suffix("hello") == _content_hash_suffix("hello")
-
-    def test_different_content(self):
-        assert _content_hash_suffix("hello") != _content_hash_suffix("world")
-
-    def test_length(self):
-        assert len(_content_hash_suffix("test content")) == 6
+    @pytest.mark.parametrize("content,other", [
+        ("hello", "world"),
+        ("test content", "test content "),
+    ])
+    def test_hash_suffix(self, content, other):
+        suffix = _content_hash_suffix(content)
+        assert suffix == _content_hash_suffix(content)
+        assert suffix != _content_hash_suffix(other)
+        assert len(suffix) == 6
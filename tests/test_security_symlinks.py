@@ -0,0 +1,43 @@
+"""Tests for symlink handling during local discovery."""
+
+import os
+
+import pytest
+
+from jdocmunch_mcp.tools.index_local import discover_local_doc_files
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="Symlinks require admin on Windows")
+
+
+class TestSymlinkProtection:
+    def test_symlink_outside_base_skipped(self, tmp_path):
+        """Symlinks pointing outside base directory should be skipped."""
+        base = tmp_path / "base"
+        base.mkdir()
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (outside / "secret.md").write_bytes(b"# Secret\n\nSecret content.\n")
+
+        # Create symlink inside base pointing to outside
+        link = base / "link"
+        link.symlink_to(outside)
+
+        (base / "normal.md").write_bytes(b"# Normal\n\nNormal doc.\n")
+
+        files = discover_local_doc_files(str(base), follow_symlinks=False)
+        assert "normal.md" in files
+        assert not any("secret" in f for f in files)
+
+    def test_symlink_inside_base_allowed_when_enabled(self, tmp_path):
+        """Symlinks within base should work when follow_symlinks=True."""
+        base = tmp_path / "base"
+        base.mkdir()
+        subdir = base / "subdir"
+        subdir.mkdir()
+        (subdir / "doc.md").write_bytes(b"# Doc\n\nContent.\n")
+
+        link = base / "link"
+        link.symlink_to(subdir)
+
+        files = discover_local_doc_files(str(base), follow_symlinks=True)
+        assert any("doc.md" in f for f in files)
@@ -1,17 +1,50 @@
 """Tests for index storage and retrieval."""
 
 import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
 import pytest
 
-from jdocmunch_mcp.parser.markdown import parse_markdown_to_sections, Section
-from jdocmunch_mcp.storage.index_store import IndexStore, RepoIndex, CURRENT_INDEX_VERSION
+from jdocmunch_mcp.parser.markdown import Section
+from jdocmunch_mcp.storage.index_store import (
+    IndexStore,
+    RepoIndex,
+    CURRENT_INDEX_VERSION,
+    normalize_line_endings,
+)
+
+
+# Hand-written index payloads, serialized once at import
+_OLD_INDEX_BYTES = json.dumps({
+    "repo": "old/repo",
+    "owner": "old",
+    "name": "repo",
+    "indexed_at": "2024-01-01T00:00:00",
+    "doc_files": ["README.md"],
+    "sections": [],
+    # No index_version field — should be treated as version 0
+}, separators=(",", ":")).encode("utf-8")
+
+_CURRENT_INDEX_BYTES = json.dumps({
+    "repo": "current/repo",
+    "owner": "current",
+    "name": "repo",
+    "indexed_at": "2025-01-15T00:00:00",
+    "doc_files": ["README.md"],
+    "sections": [],
+    "index_version": CURRENT_INDEX_VERSION,
+    "commit_hash": "abc123",
+    "file_hashes": {},
+}, separators=(",", ":")).encode("utf-8")
 
 
 class TestIndexStore:
-    def test_save_and_load(self, storage_dir):
-        store = IndexStore(storage_dir)
+    def test_save_and_load(self, store, parse_sections):
         content = "# Hello\n\nWorld.\n\n## Section\n\nContent here.\n"
-        sections = parse_markdown_to_sections(content, "README.md")
+        sections = parse_sections(content, "README.md")
         raw_files = {"README.md": content}
 
         index = store.save_index("test", "repo", ["README.md"], sections, raw_files)
@@ -26,13 +59,9 @@ class TestIndexStore:
         assert loaded.repo == "test/repo"
         assert len(loaded.sections) == len(sections)
 
-    def test_save_with_commit_hash(self, storage_dir):
-        store = IndexStore(storage_dir)
-        content = "# Doc\n\nContent.\n"
-        sections = parse_markdown_to_sections(content, "doc.md")
-
+    def test_save_with_commit_hash(self, store, doc_content, doc_sections):
         index = store.save_index(
-            "test", "repo", ["doc.md"], sections, {"doc.md": content},
+            "test", "repo", ["doc.md"], doc_sections, {"doc.md": doc_content},
             commit_hash="abc123def456",
             file_hashes={"doc.md": "sha256hash"},
         )
@@ -44,53 +73,26 @@ class TestIndexStore:
         assert loaded.commit_hash == "abc123def456"
         assert loaded.file_hashes["doc.md"] == "sha256hash"
 
-    def test_backward_compatible_loading_rejects_old(self, storage_dir):
+    def test_backward_compatible_loading_rejects_old(self, store):
         """Old-format cache (no index_version) should return None."""
-        store = IndexStore(storage_dir)
         # Write a fake old-format index
-        index_path = store._index_path("old", "repo")
-        old_data = {
-            "repo": "old/repo",
-            "owner": "old",
-            "name": "repo",
-            "indexed_at": "2024-01-01T00:00:00",
-            "doc_files": ["README.md"],
-            "sections": [],
-            # No index_version field — should be treated as version 0
-        }
-        with open(index_path, "w") as f:
-            json.dump(old_data, f)
+        store._index_path("old", "repo").write_bytes(_OLD_INDEX_BYTES)
 
         loaded = store.load_index("old", "repo")
         assert loaded is None  # Old format rejected
 
-    def test_current_version_loads(self, storage_dir):
+    def test_current_version_loads(self, store):
         """Current-version cache should load correctly."""
-        store = IndexStore(storage_dir)
-        index_path = store._index_path("current", "repo")
-        data = {
-            "repo": "current/repo",
-            "owner": "current",
-            "name": "repo",
-            "indexed_at": "2025-01-15T00:00:00",
-            "doc_files": ["README.md"],
-            "sections": [],
-            "index_version": CURRENT_INDEX_VERSION,
-            "commit_hash": "abc123",
-            "file_hashes": {},
-        }
-        with open(index_path, "w") as f:
-            json.dump(data, f)
+        store._index_path("current", "repo").write_bytes(_CURRENT_INDEX_BYTES)
 
         loaded = store.load_index("current", "repo")
         assert loaded is not None
         assert loaded.commit_hash == "abc123"
 
-    def test_line_ending_normalization(self, storage_dir):
+    def test_line_ending_normalization(self, store, parse_sections):
         """Raw files should be normalized to \\n line endings."""
-        store = IndexStore(storage_dir)
         content_crlf = "# Hello\r\n\r\nWorld.\r\n"
-        sections = parse_markdown_to_sections(content_crlf.replace('\r\n', '\n'), "README.md")
+        sections = parse_sections(content_crlf.replace('\r\n', '\n'), "README.md")
 
         store.save_index("test", "norm", ["README.md"], sections, {"README.md": content_crlf})
 
@@ -100,11 +102,45 @@ class TestIndexStore:
         assert b"\r\n" not in raw
         assert b"\n" in raw
 
-    def test_get_section_content_byte_offset(self, storage_dir):
+    def test_bytes_raw_files(self, store, parse_sections):
+        content = "# Café\r\n\r\nNaïve.\r\n"
+        sections = parse_sections(normalize_line_endings(content), "doc.md")
+        store.save_index("test", "repo", ["doc.md"], sections, {"doc.md": content.encode("utf-8")})
+
+        cached = store._content_dir("test", "repo") / "doc.md"
+        assert cached.read_bytes() == normalize_line_endings(content).encode("utf-8")
+        assert store.get_section_content("test", "repo", sections[0].id) == sections[0].content
+
+    def test_normalize_line_endings(self):
+        assert normalize_line_endings("# A\r\n\r\nB.\rC.\n") == "# A\n\nB.\nC.\n"
+        plain = "# A\n\nB.\n"
+        assert normalize_line_endings(plain) is plain
+
+    def test_staged_raw_files(self, store, parse_sections):
+        """Staged raw files only replace cached content when the index is saved."""
+        content = "# Doc\n\nOriginal.\n"
+        sections = parse_sections(content, "docs/doc.md")
+        store.save_index("test", "repo", ["docs/doc.md"], sections, {"docs/doc.md": content})
+        cached = store._content_dir("test", "repo") / "docs" / "doc.md"
+
+        store.stage_raw_file("test", "repo", "docs/doc.md", "# Doc\r\n\r\nDiscarded.\r\n")
+        store.discard_staged("test", "repo")
+        assert cached.read_text() == content
+
+        updated = "# Doc\r\n\r\nUpdated.\r\n"
+        store.stage_raw_file("test", "repo", "docs/doc.md", updated)
+        assert cached.read_text() == content
+        sections = parse_sections(updated.replace("\r\n", "\n"), "docs/doc.md")
+        store.save_index("test", "repo", ["docs/doc.md"], sections)
+
+        assert cached.read_bytes() == b"# Doc\n\nUpdated.\n"
+        assert not store._staging_dir("test", "repo").exists()
+        assert store.get_section_content("test", "repo", sections[0].id) == sections[0].content
+
+    def test_get_section_content_byte_offset(self, store, parse_sections):
         """Byte-offset retrieval should return correct content."""
-        store = IndexStore(storage_dir)
         content = "# Hello\n\nIntro paragraph.\n\n## Section Two\n\nSection two content.\n"
-        sections = parse_markdown_to_sections(content, "doc.md")
+        sections = parse_sections(content, "doc.md")
 
         store.save_index("test", "repo", ["doc.md"], sections, {"doc.md": content})
 
@@ -113,40 +149,71 @@ class TestIndexStore:
             assert retrieved is not None
             assert retrieved == s.content
 
-    def test_delete_index(self, storage_dir):
-        store = IndexStore(storage_dir)
-        content = "# Doc\n\nContent.\n"
-        sections = parse_markdown_to_sections(content, "doc.md")
-        store.save_index("test", "repo", ["doc.md"], sections, {"doc.md": content})
+    def test_section_lookups(self, store, parse_sections):
+        content = "# Doc\n\nIntro.\n\n## Part\n\nMore.\n"
+        sections = parse_sections(content, "a.md") + parse_sections(content, "docs/b.md")
+        store.save_index("test", "repo", ["a.md", "docs/b.md"], sections,
+                         {"a.md": content, "docs/b.md": content})
+        loaded = store.load_index("test", "repo")
+
+        for s in loaded.sections:
+            assert loaded.get_section(s["id"]) is s
+        assert loaded.get_section("missing") is None
+        assert loaded.file_sections("docs/b.md") == [s for s in loaded.sections if s["file"] == "docs/b.md"]
+        assert loaded.file_sections("missing.md") == []
+
+    def test_delete_index(self, store, doc_content, doc_sections):
+        store.save_index("test", "repo", ["doc.md"], doc_sections, {"doc.md": doc_content})
 
         assert store.load_index("test", "repo") is not None
         assert store.delete_index("test", "repo") is True
         assert store.load_index("test", "repo") is None
 
-    def test_delete_nonexistent(self, storage_dir):
-        store = IndexStore(storage_dir)
+    def test_load_index_cached_until_file_changes(self, storage_dir, store, doc_content, doc_sections):
+        store.save_index("test", "repo", ["doc.md"], doc_sections, {"doc.md": doc_content})
+
+        first = store.load_index("test", "repo")
+        assert store.load_index("test", "repo") is first
+        assert IndexStore(storage_dir).load_index("test", "repo") is first
+
+        # Re-saving replaces the cached entry
+        store.save_index("test", "repo", ["doc.md"], doc_sections, {"doc.md": doc_content},
+                         commit_hash="abc")
+        reloaded = store.load_index("test", "repo")
+        assert reloaded is not first
+        assert reloaded.commit_hash == "abc"
+
+        # Changes made behind the store's back are picked up via mtime/size
+        index_path = store._index_path("test", "repo")
+        header, rest = index_path.read_bytes().split(b"\n", 1)
+        data = json.loads(header)
+        data["commit_hash"] = "external"
+        index_path.write_bytes(json.dumps(data, separators=(",", ":")).encode("utf-8") + b"\n" + rest)
+        assert store.load_index("test", "repo").commit_hash == "external"
+
+        # A same-size replacement with the same mtime is caught by its new inode
+        st = index_path.stat()
+        replacement = index_path.with_name("replacement.tmp")
+        replacement.write_bytes(index_path.read_bytes().replace(b'"external"', b'"EXTERNAL"'))
+        os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(replacement, index_path)
+        assert store.load_index("test", "repo").commit_hash == "EXTERNAL"
+
+    def test_delete_nonexistent(self, store):
         assert store.delete_index("nonexistent", "repo") is False
 
-    def test_list_repos(self, storage_dir):
-        store = IndexStore(storage_dir)
-        content = "# Doc\n\nContent.\n"
-        sections = parse_markdown_to_sections(content, "doc.md")
-
-        store.save_index("owner1", "repo1", ["doc.md"], sections, {"doc.md": content})
-        store.save_index("owner2", "repo2", ["doc.md"], sections, {"doc.md": content})
+    def test_list_repos(self, store, doc_content, doc_sections):
+        store.save_index("owner1", "repo1", ["doc.md"], doc_sections, {"doc.md": doc_content})
+        store.save_index("owner2", "repo2", ["doc.md"], doc_sections, {"doc.md": doc_content})
 
         repos = store.list_repos()
         assert len(repos) == 2
-        repo_names = {r["repo"] for r in repos}
-        assert "owner1/repo1" in repo_names
-        assert "owner2/repo2" in repo_names
-
-    def test_list_repos_includes_new_fields(self, storage_dir):
-        store = IndexStore(storage_dir)
-        content = "# Doc\n\nContent.\n"
-        sections = parse_markdown_to_sections(content, "doc.md")
+        assert any(r["repo"] == "owner1/repo1" for r in repos)
+        assert any(r["repo"] == "owner2/repo2" for r in repos)
+
+    def test_list_repos_includes_new_fields(self, store, doc_content, doc_sections):
         store.save_index(
-            "test", "repo", ["doc.md"], sections, {"doc.md": content},
+            "test", "repo", ["doc.md"], doc_sections, {"doc.md": doc_content},
             commit_hash="deadbeef",
         )
 
@@ -155,10 +222,41 @@ class TestIndexStore:
         assert repos[0]["index_version"] == CURRENT_INDEX_VERSION
         assert repos[0]["commit_hash"] == "deadbeef"
 
-    def test_search(self, storage_dir):
-        store = IndexStore(storage_dir)
+    def test_index_file_is_ndjson(self, store, parse_sections):
+        content = "# Doc\n\nContent.\n\n## Part\n\nMore.\n"
+        sections = parse_sections(content, "doc.md")
+        store.save_index("test", "repo", ["doc.md"], sections, {"doc.md": content},
+                         commit_hash="abc")
+
+        lines = store._index_path("test", "repo").read_bytes().splitlines()
+        header = json.loads(lines[0])
+        assert "sections" not in header
+        assert header["section_count"] == len(sections) == len(lines) - 1
+        assert [json.loads(line)["id"] for line in lines[1:]] == [s.id for s in sections]
+
+    def test_legacy_single_document_index_loads(self, store, doc_content, doc_sections):
+        """Indexes written as one indented JSON document still load and list."""
+        saved = store.save_index("test", "repo", ["doc.md"], doc_sections, {"doc.md": doc_content})
+        index_path = store._index_path("test", "repo")
+        legacy = {f: getattr(saved, f) for f in (
+            "repo", "owner", "name", "indexed_at", "doc_files", "sections",
+            "index_version", "commit_hash", "file_hashes",
+        )}
+        index_path.write_bytes(json.dumps(legacy, indent=2).encode("utf-8"))
+
+        loaded = store.load_index("test", "repo")
+        assert loaded.sections == saved.sections
+        assert store.list_repos()[0]["section_count"] == len(saved.sections)
+
+    def test_list_repos_skips_corrupt_index(self, store):
+        store._index_path("current", "repo").write_bytes(_CURRENT_INDEX_BYTES)
+        store._index_path("broken", "repo").write_bytes(b'{"repo": ')
+
+        assert [r["repo"] for r in store.list_repos()] == ["current/repo"]
+
+    def test_search(self, store, parse_sections):
         content = "# Installation\n\nInstall with pip.\n\n## Configuration\n\nConfigure settings.\n"
-        sections = parse_markdown_to_sections(content, "doc.md")
+        sections = parse_sections(content, "doc.md")
         for s in sections:
             s.summary = f"Summary for {s.title}"
 
@@ -168,32 +266,115 @@ class TestIndexStore:
         results = loaded.search("install")
         assert len(results) > 0
         assert results[0]["title"] == "Installation"
+        # Matching is case-insensitive and repeatable on the same index object
+        assert loaded.search("INSTALL") == results
+        # Top-K selection keeps the same order as a full sort
+        assert loaded.search("summary", max_results=1) == loaded.search("summary")[:1]
+
+    def test_search_substring_and_punctuation(self, store, parse_sections):
+        content = "# API\n\nOverview.\n\n## GET /users\n\nList users.\n\n## Settings\n\nConfigure.\n"
+        sections = parse_sections(content, "api.md")
+        store.save_index("test", "repo", ["api.md"], sections, {"api.md": content})
+        loaded = store.load_index("test", "repo")
 
+        # Query words match inside longer tokens and across punctuation
+        assert [r["title"] for r in loaded.search("sett")] == ["Settings"]
+        assert loaded.search("/users")[0]["title"] == "GET /users"
+        assert loaded.search("get /users")[0]["title"] == "GET /users"
+        # Punctuation-only and empty queries still fall back to a full scan
+        assert [r["title"] for r in loaded.search("/")] == ["GET /users"]
+        assert len(loaded.search("")) == len(sections)
+        assert loaded.search("nomatch") == []
+
+    def test_candidate_positions_match_token_scan(self, store, parse_sections):
+        content = "# Set up\n\nSetup, settings, reset.\n\n## Usage\n\nUse it.\n\n## Zeta\n\nLast set.\n"
+        sections = parse_sections(content, "doc.md")
+        for s in sections:
+            s.summary = s.content
+        store.save_index("test", "repo", ["doc.md"], sections, {"doc.md": content})
+        loaded = store.load_index("test", "repo")
 
-class TestUpdateIndex:
-    def test_incremental_update(self, storage_dir):
-        store = IndexStore(storage_dir)
+        postings = loaded._postings()
+        for word in ("set", "se", "zeta", "a", "use it", "nomatch"):
+            expected = {
+                p for w in word.split() for token, positions in postings.items()
+                if w in token for p in positions
+            }
+            assert loaded._candidate_positions(set(word.split())) == expected
+
+    def test_search_filters(self, store, parse_sections):
+        content = "# Guide\n\nSetup guide.\n\n## Setup Details\n\nMore setup.\n"
+        sections = (parse_sections(content, "README.md")
+                    + parse_sections(content, "docs/setup.md"))
+        store.save_index("test", "repo", ["README.md", "docs/setup.md"], sections,
+                         {"README.md": content, "docs/setup.md": content})
+        loaded = store.load_index("test", "repo")
 
-        # Initial index with 2 files
-        content1 = "# File 1\n\nContent one.\n"
-        content2 = "# File 2\n\nContent two.\n"
-        sections1 = parse_markdown_to_sections(content1, "file1.md")
-        sections2 = parse_markdown_to_sections(content2, "file2.md")
-        all_sections = sections1 + sections2
+        assert {r["file"] for r in loaded.search("setup")} == {"README.md", "docs/setup.md"}
+        assert {r["file"] for r in loaded.search("setup", path_prefix="docs/")} == {"docs/setup.md"}
+        assert {r["file"] for r in loaded.search("setup", file_pattern="*.md")} == {"README.md", "docs/setup.md"}
+        assert {r["file"] for r in loaded.search("setup", file_pattern="README*")} == {"README.md"}
+        assert all(r["depth"] <= 1 for r in loaded.search("setup", max_depth=1))
+        assert loaded.search("setup", path_prefix="docs/", max_depth=0) == []
+
+        # The same filters select TOC sections, keeping index order
+        assert loaded.filter_sections() is loaded.sections
+        assert loaded.filter_sections(file_pattern="README*") == [
+            s for s in loaded.sections if s["file"] == "README.md"
+        ]
+        assert loaded.filter_sections(path_prefix="docs/", max_depth=1) == [
+            s for s in loaded.sections if s["file"] == "docs/setup.md" and s["depth"] <= 1
+        ]
+
+
+UPDATE_CONTENT1 = b"# File 1\n\nContent one.\n"
+UPDATE_CONTENT2 = b"# File 2\n\nContent two.\n"
+
+
+def _link_or_copy(src, dst):
+    """Hard link src to dst, copying where hard links are unsupported.
+
+    The store replaces files by rename rather than rewriting them, so
+    updating a linked copy leaves the source untouched.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+@pytest.fixture(scope="module")
+def update_base_dir(storage_root, parse_sections):
+    """Initial two-file index for TestUpdateIndex, saved once per module.
+
+    Lives under storage_root, on the same filesystem as storage_dir, so
+    per-test copies can be hard links.
+    """
+    base = Path(tempfile.mkdtemp(prefix="update-base-", dir=storage_root))
+    IndexStore(str(base)).save_index(
+        "test", "repo",
+        ["file1.md", "file2.md"],
+        parse_sections(UPDATE_CONTENT1.decode(), "file1.md") + parse_sections(UPDATE_CONTENT2.decode(), "file2.md"),
+        {"file1.md": UPDATE_CONTENT1, "file2.md": UPDATE_CONTENT2},
+        file_hashes={"file1.md": "hash1", "file2.md": "hash2"},
+    )
+    return base
 
-        store.save_index(
-            "test", "repo",
-            ["file1.md", "file2.md"],
-            all_sections,
-            {"file1.md": content1, "file2.md": content2},
-            file_hashes={"file1.md": "hash1", "file2.md": "hash2"},
-        )
 
+class TestUpdateIndex:
+    @pytest.fixture
+    def indexed_store(self, update_base_dir, storage_dir):
+        """A private copy of the initial index for each test to update."""
+        shutil.copytree(update_base_dir, storage_dir, dirs_exist_ok=True, copy_function=_link_or_copy)
+        return IndexStore(storage_dir)
+
+    def test_incremental_update(self, indexed_store, parse_sections):
         # Update: file1 changed, file2 unchanged
         new_content1 = "# File 1 Updated\n\nNew content.\n"
-        new_sections1 = parse_markdown_to_sections(new_content1, "file1.md")
+        new_sections1 = parse_sections(new_content1, "file1.md")
 
-        updated = store.update_index(
+        updated = indexed_store.update_index(
             "test", "repo",
             changed_files={"file1.md": new_content1},
             deleted_files=[],
@@ -214,23 +395,8 @@ class TestUpdateIndex:
         assert updated.file_hashes["file1.md"] == "hash1_new"
         assert updated.file_hashes["file2.md"] == "hash2"
 
-    def test_delete_file_in_update(self, storage_dir):
-        store = IndexStore(storage_dir)
-
-        content1 = "# File 1\n\nContent.\n"
-        content2 = "# File 2\n\nContent.\n"
-        sections = parse_markdown_to_sections(content1, "file1.md") + \
-                   parse_markdown_to_sections(content2, "file2.md")
-
-        store.save_index(
-            "test", "repo",
-            ["file1.md", "file2.md"],
-            sections,
-            {"file1.md": content1, "file2.md": content2},
-            file_hashes={"file1.md": "h1", "file2.md": "h2"},
-        )
-
-        updated = store.update_index(
+    def test_delete_file_in_update(self, indexed_store):
+        updated = indexed_store.update_index(
             "test", "repo",
             changed_files={},
             deleted_files=["file2.md"],
@@ -242,3 +408,27 @@ class TestUpdateIndex:
         assert "file2.md" not in updated.doc_files
         assert "file2.md" not in updated.file_hashes
         assert all(s["file"] != "file2.md" for s in updated.sections)
+
+    def test_update_leaves_linked_source_untouched(self, update_base_dir, indexed_store, parse_sections):
+        store = indexed_store
+        storage = store.base_path
+        base_index = update_base_dir / "test-repo.json"
+        base_raw = update_base_dir / "test-repo" / "file1.md"
+        index_before, raw_before = base_index.read_bytes(), base_raw.read_bytes()
+        if os.name == "posix":
+            # The per-test copy really shares the base files
+            assert os.path.samefile(storage / "test-repo.json", base_index)
+
+        new_content1 = "# File 1 Updated\n\nNew content.\n"
+        store.update_index(
+            "test", "repo",
+            changed_files={"file1.md": new_content1},
+            deleted_files=[],
+            new_sections_by_file={"file1.md": parse_sections(new_content1, "file1.md")},
+            new_file_hashes={"file1.md": "hash1_new"},
+        )
+
+        assert (storage / "test-repo" / "file1.md").read_text() == new_content1
+        assert base_index.read_bytes() == index_before
+        assert base_raw.read_bytes() == raw_before
+        assert not list(storage.rglob("*.tmp"))
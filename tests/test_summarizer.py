@@ -0,0 +1,81 @@
+"""Tests for section summarization."""
+
+import asyncio
+import json
+
+from jdocmunch_mcp.parser.markdown import parse_markdown_to_sections
+from jdocmunch_mcp.summarizer import batch_summarize
+from jdocmunch_mcp.summarizer.batch_summarize import BatchSummarizer
+
+
+class TestSummarizeSections:
+    async def test_one_request_for_many_sections(self, monkeypatch):
+        prompts = []
+
+        async def fake_ollama(self, prompt, max_tokens=100):
+            prompts.append(prompt)
+            # Section 1 is left out of the response and falls back to its first line
+            return 'Sure: [{"id": 0, "summary": "About One"}, {"id": 2, "summary": "About Three"}]'
+
+        monkeypatch.setattr(BatchSummarizer, "_ollama_summarize", fake_ollama)
+        monkeypatch.setenv("USE_OLLAMA", "true")
+
+        sections = parse_markdown_to_sections(
+            "# One\n\nA.\n\n## Two\n\nB.\n\n## Three\n\nC.\n\n## Short\n", "doc.md"
+        )
+        summarizer = BatchSummarizer()
+        summarizer.api_key = None
+        summaries = await summarizer.summarize_sections(sections)
+
+        assert len(prompts) == 1
+        assert "[Section 2]" in prompts[0] and "## Short" not in prompts[0]
+        assert summaries == ["About One", "B.", "About Three", "## Short"]
+
+    def test_group_sections_respects_limits(self, monkeypatch):
+        monkeypatch.setattr(batch_summarize, "SECTIONS_PER_REQUEST", 2)
+        content = "".join(f"# S{i}\n\nText {i}.\n\n" for i in range(5))
+        sections = parse_markdown_to_sections(content, "doc.md")
+
+        groups = batch_summarize._group_sections(sections)
+
+        assert [len(g) for g in groups] == [2, 2, 1]
+        assert [s for g in groups for s in g] == sections
+
+    def test_parse_batch_response_ignores_malformed_entries(self):
+        text = json.dumps([
+            {"id": 0, "summary": " Fine. "},
+            {"id": 5, "summary": "Out of range"},
+            {"id": "1", "summary": "Wrong id type"},
+            {"id": 1, "summary": ""},
+            "not an object",
+        ])
+        assert batch_summarize._parse_batch_response(text, 2) == {0: "Fine."}
+        assert batch_summarize._parse_batch_response("no json here", 2) == {}
+
+    def test_parse_batch_response_skips_surrounding_brackets(self):
+        array = '[{"id": 0, "summary": "a"}, {"id": 1, "summary": "b"}]'
+        expected = {0: "a", 1: "b"}
+        assert batch_summarize._parse_batch_response(f"Summaries for [0] and [1]:\n{array}", 2) == expected
+        assert batch_summarize._parse_batch_response(f"{array}\nNote: see [docs].", 2) == expected
+        assert batch_summarize._parse_batch_response("Only [0] and [docs] here.", 2) == {}
+
+
+class TestSummarizeQueue:
+    async def test_summarizes_all_queued_batches(self, monkeypatch):
+        async def fake_summarize(self, sections):
+            await asyncio.sleep(0)
+            return [f"About {s.title}" for s in sections]
+
+        monkeypatch.setattr(BatchSummarizer, "summarize_sections", fake_summarize)
+
+        sections = parse_markdown_to_sections("# One\n\nA.\n\n## Two\n\nB.\n\n## Three\n\nC.\n", "doc.md")
+        queue: asyncio.Queue = asyncio.Queue()
+        summarizer = BatchSummarizer(concurrency=2)
+        task = asyncio.create_task(summarizer.summarize_queue(queue))
+
+        queue.put_nowait(sections[:1])
+        queue.put_nowait(sections[1:])
+        queue.put_nowait(None)
+        await task
+
+        assert [s.summary for s in sections] == ["About One", "About Two", "About Three"]
@@ -1,8 +1,11 @@
 """Tests for MCP tool implementations."""
 
+import importlib
 import os
+
 import pytest
 
+from jdocmunch_mcp.hashing import content_hash
 from jdocmunch_mcp.parser.markdown import parse_markdown_to_sections
 from jdocmunch_mcp.storage.index_store import IndexStore
 from jdocmunch_mcp.tools.get_toc import get_toc, get_toc_tree, get_document_outline
@@ -12,83 +15,119 @@ from jdocmunch_mcp.tools.list_repos import list_repos
 from jdocmunch_mcp.tools.index_local import index_local
 
 
-def _create_test_index(storage_dir: str, owner: str = "test", name: str = "repo"):
-    """Helper to create a test index with known content."""
-    store = IndexStore(storage_dir)
-    content1 = "# Project\n\nWelcome.\n\n## Installation\n\nInstall with pip.\n\n## Usage\n\nUse it.\n"
-    content2 = "# API Guide\n\n## Authentication\n\nUse tokens.\n\n## Endpoints\n\n### GET /users\n\nList users.\n"
+# Raw bytes are handed to save_index as-is; the str forms are for parsing.
+_CONTENT1 = b"# Project\n\nWelcome.\n\n## Installation\n\nInstall with pip.\n\n## Usage\n\nUse it.\n"
+_CONTENT2 = b"# API Guide\n\n## Authentication\n\nUse tokens.\n\n## Endpoints\n\n### GET /users\n\nList users.\n"
+_CONTENT1_STR = _CONTENT1.decode("utf-8")
+_CONTENT2_STR = _CONTENT2.decode("utf-8")
+
+# Parsed once at import; save_index only reads them.
+_SECTIONS1 = tuple(parse_markdown_to_sections(_CONTENT1_STR, "README.md"))
+_SECTIONS2 = tuple(parse_markdown_to_sections(_CONTENT2_STR, "docs/api.md"))
 
-    sections1 = parse_markdown_to_sections(content1, "README.md")
-    sections2 = parse_markdown_to_sections(content2, "docs/api.md")
-    all_sections = sections1 + sections2
+# Give sections summaries for search
+for _s in _SECTIONS1 + _SECTIONS2:
+    _s.summary = f"Summary: {_s.title}"
 
-    # Give sections summaries for search
-    for s in all_sections:
-        s.summary = f"Summary: {s.title}"
+REPO = "test/repo"
 
+
+def _create_test_index(storage_dir: str, owner: str = "test", name: str = "repo"):
+    """Helper to create a test index with known content."""
+    store = IndexStore(storage_dir)
     store.save_index(
         owner, name,
         ["README.md", "docs/api.md"],
-        all_sections,
-        {"README.md": content1, "docs/api.md": content2},
+        list(_SECTIONS1 + _SECTIONS2),
+        {"README.md": _CONTENT1, "docs/api.md": _CONTENT2},
         commit_hash="abc123",
         file_hashes={"README.md": "h1", "docs/api.md": "h2"},
     )
     return f"{owner}/{name}"
 
 
+@pytest.fixture(scope="module")
+def index_storage(tmp_path_factory):
+    """Storage directory holding the test index, shared by read-only tests."""
+    storage = str(tmp_path_factory.mktemp("shared_storage"))
+    _create_test_index(storage)
+    return storage
+
+
+@pytest.fixture(scope="module")
+def toc_ids(index_storage):
+    """(repo, section ids in TOC order) for the shared test index."""
+    toc = get_toc(repo=REPO, storage_path=index_storage)
+    return REPO, [s["id"] for s in toc["sections"]]
+
+
 class TestGetToc:
-    def test_basic(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_toc(repo=repo, storage_path=storage_dir)
+    def test_basic(self, index_storage):
+        result = get_toc(repo=REPO, storage_path=index_storage)
         assert "error" not in result
         assert result["section_count"] > 0
         assert "_meta" in result
         assert result["_meta"]["commit_hash"] == "abc123"
 
-    def test_path_prefix_filter(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_toc(repo=repo, storage_path=storage_dir, path_prefix="docs/")
+    def test_path_prefix_filter(self, index_storage):
+        result = get_toc(repo=REPO, storage_path=index_storage, path_prefix="docs/")
         assert "error" not in result
         # Only docs/api.md sections
-        for section in result["sections"]:
-            assert section["file"].startswith("docs/")
+        assert all(s["file"].startswith("docs/") for s in result["sections"])
 
-    def test_max_depth_filter(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_toc(repo=repo, storage_path=storage_dir, max_depth=1)
+    def test_max_depth_filter(self, index_storage):
+        result = get_toc(repo=REPO, storage_path=index_storage, max_depth=1)
         assert "error" not in result
-        for section in result["sections"]:
-            assert section["depth"] <= 1
+        assert all(s["depth"] <= 1 for s in result["sections"])
 
-    def test_file_pattern_filter(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_toc(repo=repo, storage_path=storage_dir, file_pattern="*.md")
+    def test_file_pattern_filter(self, index_storage):
+        result = get_toc(repo=REPO, storage_path=index_storage, file_pattern="*.md")
         assert "error" not in result
         assert result["section_count"] > 0
 
-    def test_include_summaries(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_toc(repo=repo, storage_path=storage_dir, include_summaries=True)
+    def test_include_summaries(self, index_storage):
+        result = get_toc(repo=REPO, storage_path=index_storage, include_summaries=True)
         has_summary = any("summary" in s for s in result["sections"])
         assert has_summary
 
+    def test_exclude_summaries(self, index_storage):
+        result = get_toc(repo=REPO, storage_path=index_storage, include_summaries=False)
+        assert result["section_count"] > 0
+        assert not any("summary" in s for s in result["sections"])
+        assert any("parent" in s for s in result["sections"])
+        assert not any("keywords" in s for s in result["sections"])
+        assert all("byte_offset" in s for s in result["sections"])
+
     def test_repo_not_found(self, storage_dir):
         result = get_toc(repo="nonexistent/repo", storage_path=storage_dir)
         assert "error" in result
 
-    def test_byte_offsets_in_response(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_toc(repo=repo, storage_path=storage_dir)
-        for section in result["sections"]:
-            assert "byte_offset" in section
-            assert "byte_length" in section
+    def test_byte_offsets_in_response(self, index_storage):
+        result = get_toc(repo=REPO, storage_path=index_storage)
+        assert all("byte_offset" in s and "byte_length" in s for s in result["sections"])
+
+    def test_entry_shape_independent_of_filters(self, storage_dir, store):
+        # Sections from an older index without size or offset fields
+        store._index_path("old", "repo").write_bytes(
+            b'{"repo": "old/repo", "owner": "old", "name": "repo", "indexed_at": "2025-01-01T00:00:00",'
+            b' "doc_files": ["doc.md"], "index_version": 1, "sections": ['
+            b'{"id": "doc-a", "file": "doc.md", "title": "A", "depth": 1, "parent": null, "summary": "S"}]}'
+        )
+        expected = {
+            "id": "doc-a", "title": "A", "depth": 1, "file": "doc.md",
+            "line_count": 0, "byte_offset": 0, "byte_length": 0,
+        }
+
+        slim = get_toc(repo="old/repo", storage_path=storage_dir, include_summaries=False)
+        filtered = get_toc(repo="old/repo", storage_path=storage_dir, include_summaries=False, max_depth=3)
+        summarized = get_toc(repo="old/repo", storage_path=storage_dir)
+        assert slim["sections"] == filtered["sections"] == [expected]
+        assert summarized["sections"] == [{**expected, "summary": "S"}]
 
 
 class TestGetTocTree:
-    def test_basic(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_toc_tree(repo=repo, storage_path=storage_dir)
+    def test_basic(self, index_storage):
+        result = get_toc_tree(repo=REPO, storage_path=index_storage)
         assert "error" not in result
         assert "tree" in result
         assert len(result["tree"]) > 0
@@ -96,107 +135,89 @@ class TestGetTocTree:
 
 
 class TestGetDocumentOutline:
-    def test_single_file(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_document_outline(repo=repo, file_path="docs/api.md", storage_path=storage_dir)
+    def test_single_file(self, index_storage):
+        result = get_document_outline(repo=REPO, file_path="docs/api.md", storage_path=index_storage)
         assert "error" not in result
         assert result["file"] == "docs/api.md"
         assert "outline" in result
         assert len(result["outline"]) > 0
 
-    def test_file_not_found(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_document_outline(repo=repo, file_path="nonexistent.md", storage_path=storage_dir)
+    def test_file_not_found(self, index_storage):
+        result = get_document_outline(repo=REPO, file_path="nonexistent.md", storage_path=index_storage)
         assert "error" in result
 
 
 class TestGetSection:
-    def test_retrieve_section(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        # Get TOC to find a section ID
-        toc = get_toc(repo=repo, storage_path=storage_dir)
-        section_id = toc["sections"][0]["id"]
+    def test_retrieve_section(self, index_storage, toc_ids):
+        repo, ids = toc_ids
+        section_id = ids[0]
 
-        result = get_section(repo=repo, section_id=section_id, storage_path=storage_dir)
+        result = get_section(repo=repo, section_id=section_id, storage_path=index_storage)
         assert "error" not in result
         assert "content" in result
         assert result["id"] == section_id
         assert "_meta" in result
 
-    def test_section_not_found(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = get_section(repo=repo, section_id="nonexistent-id", storage_path=storage_dir)
+    def test_section_not_found(self, index_storage):
+        result = get_section(repo=REPO, section_id="nonexistent-id", storage_path=index_storage)
         assert "error" in result
 
-    def test_byte_offsets_in_response(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        toc = get_toc(repo=repo, storage_path=storage_dir)
-        section_id = toc["sections"][0]["id"]
+    def test_byte_offsets_in_response(self, index_storage, toc_ids):
+        repo, ids = toc_ids
 
-        result = get_section(repo=repo, section_id=section_id, storage_path=storage_dir)
+        result = get_section(repo=repo, section_id=ids[0], storage_path=index_storage)
         assert "byte_offset" in result
         assert "byte_length" in result
 
 
 class TestGetSections:
-    def test_batch_retrieve(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        toc = get_toc(repo=repo, storage_path=storage_dir)
-        ids = [s["id"] for s in toc["sections"][:3]]
+    def test_batch_retrieve(self, index_storage, toc_ids):
+        repo, ids = toc_ids
+        ids = ids[:3]
 
-        result = get_sections(repo=repo, section_ids=ids, storage_path=storage_dir)
+        result = get_sections(repo=repo, section_ids=ids, storage_path=index_storage)
         assert len(result["sections"]) == len(ids)
         assert result["errors"] is None
 
-    def test_partial_errors(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        toc = get_toc(repo=repo, storage_path=storage_dir)
-        ids = [toc["sections"][0]["id"], "nonexistent-id"]
+    def test_partial_errors(self, index_storage, toc_ids):
+        repo, ids = toc_ids
 
-        result = get_sections(repo=repo, section_ids=ids, storage_path=storage_dir)
+        result = get_sections(repo=repo, section_ids=[ids[0], "nonexistent-id"], storage_path=index_storage)
         assert len(result["sections"]) == 1
         assert len(result["errors"]) == 1
 
 
 class TestSearchSections:
-    def test_basic_search(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = search_sections(repo=repo, query="install", storage_path=storage_dir)
+    def test_basic_search(self, index_storage):
+        result = search_sections(repo=REPO, query="install", storage_path=index_storage)
         assert "error" not in result
         assert result["result_count"] > 0
         assert "_meta" in result
 
-    def test_max_results(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = search_sections(repo=repo, query="project", max_results=2, storage_path=storage_dir)
+    def test_max_results(self, index_storage):
+        result = search_sections(repo=REPO, query="project", max_results=2, storage_path=index_storage)
         assert result["result_count"] <= 2
 
-    def test_path_prefix_filter(self, storage_dir):
-        repo = _create_test_index(storage_dir)
+    def test_path_prefix_filter(self, index_storage):
         result = search_sections(
-            repo=repo, query="authentication", storage_path=storage_dir,
+            repo=REPO, query="authentication", storage_path=index_storage,
             path_prefix="docs/",
         )
-        for r in result["results"]:
-            assert r["file"].startswith("docs/")
+        assert all(r["file"].startswith("docs/") for r in result["results"])
 
-    def test_max_depth_filter(self, storage_dir):
-        repo = _create_test_index(storage_dir)
+    def test_max_depth_filter(self, index_storage):
         result = search_sections(
-            repo=repo, query="users", storage_path=storage_dir,
+            repo=REPO, query="users", storage_path=index_storage,
             max_depth=2,
         )
-        for r in result["results"]:
-            assert r["depth"] <= 2
+        assert all(r["depth"] <= 2 for r in result["results"])
 
-    def test_no_results(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = search_sections(repo=repo, query="xyznonexistent", storage_path=storage_dir)
+    def test_no_results(self, index_storage):
+        result = search_sections(repo=REPO, query="xyznonexistent", storage_path=index_storage)
         assert result["result_count"] == 0
 
-    def test_result_fields(self, storage_dir):
-        repo = _create_test_index(storage_dir)
-        result = search_sections(repo=repo, query="install", storage_path=storage_dir)
+    def test_result_fields(self, index_storage):
+        result = search_sections(repo=REPO, query="install", storage_path=index_storage)
         if result["results"]:
             r = result["results"][0]
             assert "id" in r
@@ -221,16 +242,14 @@ class TestListRepos:
 
 
 class TestDeleteIndex:
-    def test_delete_via_store(self, storage_dir):
+    def test_delete_via_store(self, storage_dir, store):
         repo = _create_test_index(storage_dir)
-        store = IndexStore(storage_dir)
         assert store.delete_index("test", "repo") is True
         result = list_repos(storage_path=storage_dir)
         assert result["count"] == 0
 
 
 class TestIndexLocal:
-    @pytest.mark.asyncio
     async def test_index_local_basic(self, sample_doc_dir, storage_dir):
         result = await index_local(
             path=str(sample_doc_dir),
@@ -242,7 +261,6 @@ class TestIndexLocal:
         assert result["section_count"] > 0
         assert "commit_hash" in result
 
-    @pytest.mark.asyncio
     async def test_index_local_nonexistent_path(self, storage_dir):
         result = await index_local(
             path="/nonexistent/path/that/doesnt/exist",
@@ -252,7 +270,6 @@ class TestIndexLocal:
         assert result["success"] is False
         assert "error" in result
 
-    @pytest.mark.asyncio
     async def test_index_local_skips_secrets(self, sample_doc_dir_with_secrets, storage_dir):
         result = await index_local(
             path=str(sample_doc_dir_with_secrets),
@@ -264,8 +281,7 @@ class TestIndexLocal:
         if "skipped_secrets" in result:
             assert "config.md" in result["skipped_secrets"]
 
-    @pytest.mark.asyncio
-    async def test_index_local_respects_gitignore(self, sample_doc_dir, storage_dir):
+    async def test_index_local_respects_gitignore(self, sample_doc_dir, storage_dir, is_build_path):
         result = await index_local(
             path=str(sample_doc_dir),
             use_ai_summaries=False,
@@ -273,11 +289,37 @@ class TestIndexLocal:
         )
         assert result["success"] is True
         # build/output.md should be excluded by .gitignore
-        assert not any("build" in f for f in result["files"])
+        assert not any(is_build_path(f) for f in result["files"])
+
+    async def test_reindex_local_picks_up_edits(self, sample_doc_dir_rw, storage_dir):
+        first = await index_local(path=str(sample_doc_dir_rw), use_ai_summaries=False, storage_path=storage_dir)
+        assert first["success"] is True
+
+        (sample_doc_dir_rw / "docs" / "guide.md").write_bytes(b"# Guide\n\n## Rewritten\n\nNew text.\n")
+        second = await index_local(path=str(sample_doc_dir_rw), use_ai_summaries=False, storage_path=storage_dir)
+        assert second["success"] is True
+
+        toc = get_toc(repo=second["repo"], storage_path=storage_dir, path_prefix="docs/guide")
+        assert [s["title"] for s in toc["sections"]] == ["Guide", "Rewritten"]
+
+    async def test_index_local_crlf_offsets(self, tmp_path, storage_dir):
+        docs = tmp_path / "crlf"
+        docs.mkdir()
+        (docs / "doc.md").write_bytes(b"# Title\r\n\r\nIntro.\r\n\r\n## Next\r\n\r\nMore.\r\n")
+        result = await index_local(path=str(docs), use_ai_summaries=False, storage_path=storage_dir)
+        assert result["success"] is True
+
+        toc = get_toc(repo=result["repo"], storage_path=storage_dir)
+        section = get_section(repo=result["repo"], section_id=toc["sections"][-1]["id"], storage_path=storage_dir)
+        assert section["content"].startswith("## Next\n")
+
+        # The file hash covers the bytes on disk, not the normalized text
+        index = IndexStore(storage_dir).load_index("local", "crlf")
+        raw = (docs / "doc.md").read_bytes()
+        assert index.file_hashes == {"doc.md": content_hash(raw)}
 
 
 class TestLocalOnlyMode:
-    @pytest.mark.asyncio
     async def test_index_local_works_in_local_only(self, sample_doc_dir, storage_dir, monkeypatch):
         monkeypatch.setenv("JDOCMUNCH_LOCAL_ONLY", "true")
         result = await index_local(
@@ -287,10 +329,216 @@ class TestLocalOnlyMode:
         )
         assert result["success"] is True
 
-    @pytest.mark.asyncio
     async def test_index_repo_blocked_in_local_only(self, monkeypatch):
         monkeypatch.setenv("JDOCMUNCH_LOCAL_ONLY", "true")
         from jdocmunch_mcp.tools.index_repo import index_repo
         result = await index_repo(url="owner/repo", use_ai_summaries=False)
         assert result["success"] is False
         assert "local-only" in result["error"].lower()
+
+
+class TestFetchFiles:
+    async def test_fetches_concurrently_and_skips_failures(self):
+        import httpx
+        from jdocmunch_mcp.tools.index_repo import fetch_files
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            path = request.url.path.split("/contents/", 1)[1]
+            if path == "missing.md":
+                return httpx.Response(404)
+            return httpx.Response(200, text=f"# {path}\n")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            contents = await fetch_files(
+                client, "owner", "repo", ["a.md", "docs/b.md", "missing.md"], concurrency=2,
+            )
+
+        assert contents == {"a.md": "# a.md\n", "docs/b.md": "# docs/b.md\n"}
+
+    async def test_doc_contents_from_tarball(self):
+        import io
+        import tarfile
+        import httpx
+        from jdocmunch_mcp.tools.index_repo import fetch_doc_contents
+
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+            for path, data in [("README.md", b"# Readme\n"), ("src/main.py", b"print()\n")]:
+                info = tarfile.TarInfo(f"owner-repo-abc123/{path}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        tarball = buf.getvalue()
+
+        requested = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            if request.url.path.endswith("/tarball/HEAD"):
+                return httpx.Response(200, content=tarball)
+            return httpx.Response(200, text="# Fallback\n")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            contents = await fetch_doc_contents(client, "owner", "repo", ["README.md", "docs/extra.md"])
+
+        assert contents == {"README.md": "# Readme\n", "docs/extra.md": "# Fallback\n"}
+        # Only the file missing from the tarball is fetched individually
+        assert requested == ["/repos/owner/repo/tarball/HEAD", "/repos/owner/repo/contents/docs/extra.md"]
+
+
+# The module itself; jdocmunch_mcp.tools re-exports a function of the same name
+_index_repo_module = importlib.import_module("jdocmunch_mcp.tools.index_repo")
+
+
+async def _run_index_repo(storage_dir, use_ai_summaries=False, **kwargs):
+    return await _index_repo_module.index_repo(
+        url="owner/repo", use_ai_summaries=use_ai_summaries, storage_path=storage_dir, **kwargs,
+    )
+
+
+class TestIncrementalIndexRepo:
+    @pytest.fixture
+    def github(self, monkeypatch):
+        """
+        Serve owner/repo from an in-memory file map instead of GitHub.
+
+        Returns (repo_files, fetched): repo_files maps path to (blob SHA,
+        content) and may be edited between runs; fetched logs requested paths.
+        """
+        repo_files: dict[str, tuple[str, str]] = {}
+        fetched: list[str] = []
+
+        async def fake_discover(client, owner, repo, token=None):
+            paths = sorted(repo_files)
+            return paths, {p: repo_files[p][0] for p in paths}
+
+        async def fake_commit_sha(client, owner, repo, token=None):
+            return "commit"
+
+        async def fake_fetch(client, owner, repo, paths, *args, **kwargs):
+            fetched.extend(paths)
+            return {p: repo_files[p][1] for p in paths}
+
+        monkeypatch.delenv("JDOCMUNCH_LOCAL_ONLY", raising=False)
+        monkeypatch.setattr(_index_repo_module, "discover_doc_files", fake_discover)
+        monkeypatch.setattr(_index_repo_module, "_fetch_commit_sha", fake_commit_sha)
+        monkeypatch.setattr(_index_repo_module, "fetch_doc_contents", fake_fetch)
+        monkeypatch.setattr(_index_repo_module, "fetch_files", fake_fetch)
+        return repo_files, fetched
+
+    async def test_reindex_fetches_only_changed_files(self, storage_dir, github):
+        repo_files, fetched = github
+        repo_files.update({
+            "a.md": ("sha-a", "# A\n\nAlpha.\n"),
+            "b.md": ("sha-b", "# B\n\nBeta.\n"),
+            "c.md": ("sha-c", "# C\n\nGamma.\n"),
+        })
+
+        first = await _run_index_repo(storage_dir)
+        assert first["success"] is True
+        assert fetched == ["a.md", "b.md", "c.md"]
+
+        # b changes, c is removed, d is added
+        repo_files["b.md"] = ("sha-b2", "# B\n\nBeta, revised.\n")
+        del repo_files["c.md"]
+        repo_files["d.md"] = ("sha-d", "# D\n\nDelta.\n")
+        fetched.clear()
+
+        second = await _run_index_repo(storage_dir)
+        assert second["success"] is True
+        assert fetched == ["b.md", "d.md"]
+        assert second["unchanged_files"] == 1
+        assert second["files"] == ["a.md", "b.md", "d.md"]
+
+        index = IndexStore(storage_dir).load_index("owner", "repo")
+        assert index.doc_files == ["a.md", "b.md", "d.md"]
+        assert index.file_hashes == {"a.md": "sha-a", "b.md": "sha-b2", "d.md": "sha-d"}
+        assert sorted(s["file"] for s in index.sections) == ["a.md", "b.md", "d.md"]
+        assert "revised" in get_section(
+            repo="owner/repo",
+            section_id=next(s["id"] for s in index.sections if s["file"] == "b.md"),
+            storage_path=storage_dir,
+        )["content"]
+
+        # A full rebuild fetches everything again
+        fetched.clear()
+        await _run_index_repo(storage_dir, incremental=False)
+        assert fetched == ["a.md", "b.md", "d.md"]
+
+    async def test_crlf_content_offsets(self, storage_dir, github):
+        repo_files, _ = github
+        repo_files["doc.md"] = ("sha", "# Title\r\n\r\nIntro.\r\n\r\n## Next\r\n\r\nMore.\r\n")
+
+        result = await _run_index_repo(storage_dir)
+        assert result["success"] is True
+
+        toc = get_toc(repo="owner/repo", storage_path=storage_dir)
+        section = get_section(repo="owner/repo", section_id=toc["sections"][-1]["id"], storage_path=storage_dir)
+        assert section["content"] == "## Next\n\nMore.\n"
+
+    async def test_corrupt_index_triggers_full_reindex(self, storage_dir, store, github):
+        repo_files, _ = github
+        repo_files["doc.md"] = ("sha", "# Title\n\nIntro.\n")
+        store._index_path("owner", "repo").write_bytes(b'{"repo": ')
+
+        result = await _run_index_repo(storage_dir)
+        assert result["success"] is True
+        assert "unchanged_files" not in result
+        assert store.load_index("owner", "repo").doc_files == ["doc.md"]
+
+    async def test_changed_file_without_sections_leaves_no_raw_file(self, storage_dir, store, github, monkeypatch):
+        repo_files, _ = github
+        repo_files.update({"a.md": ("sha-a", "# A\n\nAlpha.\n"), "b.md": ("sha-b", "# B\n\nBeta.\n")})
+
+        parse = _index_repo_module.parse_doc_to_sections
+
+        def fake_parse(content, file_path):
+            return [] if "Emptied" in content else parse(content, file_path)
+
+        monkeypatch.setattr(_index_repo_module, "parse_doc_to_sections", fake_parse)
+
+        await _run_index_repo(storage_dir)
+        repo_files["b.md"] = ("sha-b2", "Emptied\n")
+        await _run_index_repo(storage_dir)
+
+        # b.md is still a discovered doc file but has no sections, hash, or raw copy
+        index = store.load_index("owner", "repo")
+        assert index.doc_files == ["a.md", "b.md"]
+        assert all(s["file"] == "a.md" for s in index.sections)
+        assert "b.md" not in index.file_hashes
+        assert not (store._content_dir("owner", "repo") / "b.md").exists()
+
+        # A full rebuild records the same files
+        result = await _run_index_repo(storage_dir, incremental=False)
+        assert result["files"] == store.load_index("owner", "repo").doc_files == ["a.md", "b.md"]
+        assert result["file_count"] == 2
+
+    async def test_staging_failure_stops_summarizer_and_discards_staged(self, storage_dir, store, github, monkeypatch):
+        repo_files, _ = github
+        repo_files.update({"a.md": ("sha-a", "# A\n\nAlpha.\n"), "b.md": ("sha-b", "# B\n\nBeta.\n")})
+        summarizer_finished = []
+
+        async def fake_summarize_queue(self, queue):
+            try:
+                while await queue.get() is not None:
+                    pass
+            finally:
+                summarizer_finished.append(True)
+
+        stage = IndexStore.stage_raw_file
+
+        def failing_stage(self, owner, name, file_path, content):
+            if file_path == "b.md":
+                raise OSError("disk full")
+            stage(self, owner, name, file_path, content)
+
+        # One-section batches let the summarizer start before b.md fails
+        monkeypatch.setattr(_index_repo_module, "SUMMARY_BATCH_SIZE", 1)
+        monkeypatch.setattr(_index_repo_module.BatchSummarizer, "summarize_queue", fake_summarize_queue)
+        monkeypatch.setattr(IndexStore, "stage_raw_file", failing_stage)
+
+        with pytest.raises(OSError):
+            await _run_index_repo(storage_dir, use_ai_summaries=True)
+
+        assert summarizer_finished == [True]
+        assert not store._staging_dir("owner", "repo").exists()
+        assert store.load_index("owner", "repo") is None